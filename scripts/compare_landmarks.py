@@ -0,0 +1,42 @@
+import argparse
+import os
+import time
+
+from reasoning.planner import PYPERPLAN_ARTIFACTS
+from reasoning.relaxation import compute_action_landmarks
+from reasoning.task import get_tasks
+from reasoning.utils import extract
+
+def compare_landmarks(domain: str, verbose: bool = False) -> tuple[int, int, float]:
+    """
+    Compares the native action landmarks of every task of a domain with the stored pyperplan ones.
+    Returns the number of compared tasks, the number of mismatches and the native computation time.
+    """
+    extension, _ = PYPERPLAN_ARTIFACTS["landmark"]
+    compared, mismatches, elapsed = 0, 0, 0.0
+    for task in sorted(get_tasks(domain)):
+        path = task.get_solution_path(extension)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r') as f:
+            expected = set(extract(f.read(), "landmark"))
+        start = time.perf_counter()
+        landmarks = set(compute_action_landmarks(task.domain.path, task.instance.path))
+        duration = time.perf_counter() - start
+        elapsed += duration
+        compared += 1
+        if landmarks != expected:
+            mismatches += 1
+            print(f"Mismatch for {task}: missing {sorted(expected - landmarks)}, extra {sorted(landmarks - expected)}")
+        elif verbose:
+            print(f"{task}: {len(landmarks)} landmarks in {duration:.3f}s")
+    return compared, mismatches, elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare native action landmarks with the pyperplan .lndmk files.")
+    parser.add_argument("domains", nargs="*", default=["blocksworld", "logistics", "miconic", "spanner", "minigrid"])
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    for domain in args.domains:
+        compared, mismatches, elapsed = compare_landmarks(domain, args.verbose)
+        print(f"{domain}: {compared - mismatches}/{compared} equal, {elapsed:.2f}s")
@@ -0,0 +1,203 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from reasoning.metrics import (
+    load_validation_results, aggregate_pass_at_k, pass_at_k_to_table, metrics_by_attempt_to_table,
+)
+from reasoning.settings import (
+    CACHE_DIR, EXPERIMENTS_DIR, PASS_AT_K_METRIC_FILE_NAME, METRICS_BY_ATTEMPT_FILE_NAME, METRICS_STATE_FILE_NAME,
+)
+
+GROUP_COLUMNS = ['experiment', 'domain', 'model', 'template']
+VALIDATION_COLUMNS = GROUP_COLUMNS + ['instance', 'sample_id', 'valid', 'num_action_landmarks', 'num_action_landmarks_used']
+
+def _group_key(group: tuple) -> str:
+    return "|".join(map(str, group))
+
+def _group(key: str) -> tuple[str, ...]:
+    return tuple(key.split("|"))
+
+def _add(stats: dict, key: str, values: list[float], sign: int) -> None:
+    current = stats.setdefault(key, [0.0] * len(values))
+    for i, value in enumerate(values):
+        current[i] += sign * value
+
+
+class MetricsAggregator:
+    """
+    Incrementally maintained pass@k and per-attempt metrics of one experiment.
+
+    The state (kept in CACHE_DIR) holds the last seen verdict of every sample and, per
+    (domain, model, template), the sufficient statistics of each instance (samples, correct samples,
+    landmark sums) and of each attempt (instances, valid instances, landmark ratio sum and count).
+    Updating with new validation rows only touches the statistics of the samples that changed, and
+    only the rows of the changed groups are recomputed in pass@k.csv and metrics_by_attempt.csv.
+    """
+    def __init__(self, experiment_path: str, n_bootstrap: int = 1000, confidence: float = 0.95, seed: int = 0):
+        self.experiment_path : str = experiment_path
+        self.experiment : str = os.path.basename(os.path.normpath(experiment_path))
+        self.n_bootstrap : int = n_bootstrap
+        self.confidence : float = confidence
+        self.seed : int = seed
+        self.state_path : str = os.path.join(CACHE_DIR, METRICS_STATE_FILE_NAME.format(self.experiment))
+        self.state : dict = {"max_k": 0, "samples": {}, "instances": {}, "attempts": {}}
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r') as f:
+                    self.state = json.load(f)
+            except ValueError:
+                pass
+
+    def _apply(self, group_key: str, instance: str, sample_id: str, verdict: list, sign: int) -> None:
+        valid, num_landmarks, num_landmarks_used = verdict
+        _add(self.state["instances"].setdefault(group_key, {}), instance,
+             [1, valid, num_landmarks, num_landmarks_used], sign)
+        ratio = num_landmarks_used / num_landmarks if num_landmarks else None
+        _add(self.state["attempts"].setdefault(group_key, {}), sample_id,
+             [1, valid, ratio or 0.0, ratio is not None], sign)
+
+    def update(self, df: pd.DataFrame, complete: bool = False) -> set[str]:
+        """
+        Folds validation rows into the statistics and returns the keys of the groups that changed.
+
+        With complete, df holds every sample of the experiment and samples missing from it are dropped.
+        """
+        df = df[df['experiment'] == self.experiment]
+        valid = pd.to_numeric(df['valid'], errors='coerce').fillna(0).astype(bool).astype(int)
+        num_landmarks = pd.to_numeric(df['num_action_landmarks'], errors='coerce').fillna(0)
+        num_landmarks_used = pd.to_numeric(df['num_action_landmarks_used'], errors='coerce').fillna(0)
+        samples = self.state["samples"]
+        changed, seen = set(), set()
+        for row in zip(*(df[column] for column in GROUP_COLUMNS), df['instance'], df['sample_id'],
+                       valid, num_landmarks, num_landmarks_used):
+            group_key = _group_key(row[:4])
+            instance, sample_id = str(row[4]), str(int(row[5]))
+            verdict = [int(row[6]), float(row[7]), float(row[8])]
+            seen.add((group_key, instance, sample_id))
+            group_samples = samples.setdefault(group_key, {}).setdefault(instance, {})
+            previous = group_samples.get(sample_id)
+            if previous == verdict:
+                continue
+            if previous is not None:
+                self._apply(group_key, instance, sample_id, previous, -1)
+            self._apply(group_key, instance, sample_id, verdict, +1)
+            group_samples[sample_id] = verdict
+            changed.add(group_key)
+
+        if complete:
+            for group_key, instances in samples.items():
+                for instance, group_samples in instances.items():
+                    for sample_id in [s for s in group_samples if (group_key, instance, s) not in seen]:
+                        self._apply(group_key, instance, sample_id, group_samples.pop(sample_id), -1)
+                        changed.add(group_key)
+
+        max_k = max((int(s) for instances in samples.values() for group_samples in instances.values() for s in group_samples), default=0)
+        if max_k != self.state["max_k"]:
+            # pass@k columns depend on the largest attempt, so every group is recomputed
+            self.state["max_k"] = max_k
+            changed.update(samples)
+        self._prune()
+        return changed
+
+    def _prune(self) -> None:
+        for name in ("samples", "instances", "attempts"):
+            for group_key in list(self.state[name]):
+                entries = self.state[name][group_key]
+                if name == "samples":
+                    for instance in [i for i, s in entries.items() if not s]:
+                        del entries[instance]
+                else:
+                    for key in [k for k, stats in entries.items() if stats[0] <= 0]:
+                        del entries[key]
+                if not entries:
+                    del self.state[name][group_key]
+
+    def _pass_at_k(self, group_keys: set[str]) -> pd.DataFrame:
+        rows = []
+        # Same row order as the groupby of compute_pass_at_k, which the seeded bootstrap depends on
+        for group_key in sorted(group_keys, key=_group):
+            for instance, (n, c, landmarks, landmarks_used) in sorted(self.state["instances"].get(group_key, {}).items()):
+                rows.append((*_group(group_key), instance, int(c), int(n), landmarks / n, landmarks_used / n))
+        results_df = pd.DataFrame(rows, columns=GROUP_COLUMNS + [
+            'instance', 'correct_samples', 'total_samples', 'num_action_landmarks', 'num_action_landmarks_used'
+        ])
+        if results_df.empty:
+            return results_df
+        return aggregate_pass_at_k(results_df, self.state["max_k"], self.n_bootstrap, self.confidence, self.seed)
+
+    def _metrics_by_attempt(self, group_keys: set[str]) -> pd.DataFrame:
+        rows = []
+        for group_key in sorted(group_keys, key=_group):
+            for sample_id, (count, valid, ratio_sum, ratio_count) in self.state["attempts"].get(group_key, {}).items():
+                landmarks = ratio_sum / ratio_count if ratio_count else np.nan
+                rows.append((*_group(group_key), int(sample_id), int(count), valid / count, landmarks))
+        grouped = pd.DataFrame(rows, columns=GROUP_COLUMNS + ['attempt', 'total_instances', 'coverage', 'landmarks'])
+        float_cols = grouped.select_dtypes(include=['float']).columns
+        grouped[float_cols] = grouped[float_cols].round(2)
+        return grouped
+
+    def _merge(self, file_name: str, fresh: pd.DataFrame, changed: set[str], sort_cols: list[str]) -> pd.DataFrame:
+        """
+        Replaces the rows of the changed groups in an experiment's metrics CSV.
+        """
+        path = os.path.join(self.experiment_path, file_name)
+        if os.path.exists(path):
+            existing = pd.read_csv(path)
+            keys = existing[GROUP_COLUMNS].astype(str).agg("|".join, axis=1)
+            existing = existing[~keys.isin(changed)]
+            df = pd.concat([existing, fresh], ignore_index=True) if not existing.empty else fresh
+        else:
+            df = fresh
+        df = df.sort_values(sort_cols, kind="stable").reset_index(drop=True)
+        df.to_csv(path, index=False)
+        return df
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(temp_path, self.state_path)
+
+    def refresh(self, df: Optional[pd.DataFrame] = None) -> set[str]:
+        """
+        Updates the metrics with df (default: the experiment's full validation results) and rewrites the
+        metrics files and LaTeX tables if any group changed. Returns the keys of the changed groups.
+        """
+        complete = df is None
+        if complete:
+            df = load_validation_results(self.experiment_path, VALIDATION_COLUMNS)
+        changed = self.update(df, complete=complete)
+        outputs_exist = all(
+            os.path.exists(os.path.join(self.experiment_path, name))
+            for name in (PASS_AT_K_METRIC_FILE_NAME, METRICS_BY_ATTEMPT_FILE_NAME)
+        )
+        if not outputs_exist:
+            changed = set(self.state["samples"]) | changed
+        if changed:
+            pass_at_k_df = self._merge(PASS_AT_K_METRIC_FILE_NAME, self._pass_at_k(changed), changed, GROUP_COLUMNS)
+            by_attempt_df = self._merge(METRICS_BY_ATTEMPT_FILE_NAME, self._metrics_by_attempt(changed), changed, GROUP_COLUMNS + ['attempt'])
+            pass_at_k_to_table(pass_at_k_df, self.experiment_path)
+            metrics_by_attempt_to_table(by_attempt_df, self.experiment_path)
+        self.save()
+        return changed
+
+
+if __name__ == "__main__":
+    if not os.path.isdir(EXPERIMENTS_DIR):
+        print(f"Error: Experiments directory not found at '{EXPERIMENTS_DIR}'")
+    else:
+        for experiment in sorted(os.listdir(EXPERIMENTS_DIR)):
+            experiment_path = os.path.join(EXPERIMENTS_DIR, experiment)
+            if os.path.isdir(experiment_path):
+                try:
+                    print(f"Processing experiment: {experiment}...")
+                    # Only the groups whose validation results changed since the last run are recomputed
+                    changed = MetricsAggregator(experiment_path).refresh()
+                    print(f"{len(changed)} group(s) updated.")
+                except Exception as e:
+                    print(f"Could not process experiment '{experiment}': {e}")
@@ -0,0 +1,205 @@
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterator
+
+import reasoning.prompt
+from reasoning.planner import ARTIFACT_STORE, get_artifact_key
+from reasoning.prompt import get_prompt_builder
+from reasoning.settings import PROMPT_BUNDLES_DIR, PROMPT_BUNDLE_FILE_NAME
+from reasoning.task import Task, Domain, Instance
+from reasoning.catalog import BenchmarkCatalog
+
+# Version of the bundle format and of the prompt records; bump it when records change in ways builder_fingerprint cannot see
+BUNDLE_VERSION = "2"
+
+def sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+@lru_cache(maxsize=None)
+def file_sha256(path: str, mtime_ns: int) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def input_hashes(task: Task) -> tuple[str, str]:
+    """
+    Hashes of the domain and instance files of a task, recomputed only when a file changes.
+    """
+    return (
+        file_sha256(task.domain.path, os.stat(task.domain.path).st_mtime_ns),
+        file_sha256(task.instance.path, os.stat(task.instance.path).st_mtime_ns),
+    )
+
+def get_grid_tasks(domains: list[str], instances: int | None = None) -> list[Task]:
+    """
+    Tasks of each domain, restricted to the last instances ones (by instance id; all if 0 or None) like generate.py does.
+    """
+    tasks = []
+    for domain in domains:
+        catalog = BenchmarkCatalog(domain)
+        tasks.extend(catalog.tasks(catalog.last(instances)))
+    return tasks
+
+def builder_fingerprint(templates: list[str]) -> str:
+    """
+    Hash of everything the prompts of templates are built from besides the tasks: the bundle version,
+    the prompt builders and their templates (prompt.py), the example tasks and the producers of the
+    planner artifacts they use.
+    """
+    parts = [BUNDLE_VERSION, file_sha256(reasoning.prompt.__file__, os.stat(reasoning.prompt.__file__).st_mtime_ns)]
+    for template in sorted(templates):
+        prompt_builder = get_prompt_builder(template)
+        if prompt_builder is None:
+            parts.append(f"{template}:unknown")
+            continue
+        parts.append(template)
+        parts.extend(hash for example in prompt_builder.examples for hash in input_hashes(example))
+        # Ordered landmarks are sorted along the reference plan, when there is one
+        objs = set(prompt_builder.artifacts) | ({"plan"} if "landmark" in prompt_builder.artifacts else set())
+        parts.extend(f"{obj}:{get_artifact_key(obj)}" for obj in sorted(objs))
+    return sha256(json.dumps(parts))
+
+def selection_sha256(tasks: list[Task]) -> str:
+    """
+    Hash of the instances selected for a grid, which changes when the catalog gains or loses instances.
+    """
+    return sha256(json.dumps([[task.domain.name, task.instance.path] for task in tasks]))
+
+def get_bundle_path(templates: list[str], domains: list[str], instances: int | None = None) -> str:
+    grid = json.dumps([sorted(templates), sorted(domains), instances])
+    return os.path.join(PROMPT_BUNDLES_DIR, PROMPT_BUNDLE_FILE_NAME.format(sha256(grid)[:12]))
+
+def compile_prompt(template: str, task: Task) -> dict:
+    domain_sha256, instance_sha256 = input_hashes(task)
+    record = {
+        "template": template,
+        "domain": task.domain.name,
+        "domain_path": task.domain.path,
+        "instance": task.instance.name,
+        "instance_path": task.instance.path,
+        "domain_sha256": domain_sha256,
+        "instance_sha256": instance_sha256,
+    }
+    prompt_builder = get_prompt_builder(template)
+    try:
+        prompt = prompt_builder.build(task)
+    except (ValueError, RuntimeError) as e:
+        record["error"] = str(e)
+        return record
+    record.update({
+        "prompt": prompt,
+        "prompt_sha256": sha256(prompt),
+        "metadata": prompt_builder.get_metadata(task),
+    })
+    return record
+
+def precompile(templates: list[str], domains: list[str], instances: int | None = None, path: str | None = None, max_workers: int | None = None) -> str:
+    """
+    Builds the prompts of every (template, task) of the grid and writes them to a gzipped JSON Lines bundle.
+
+    The planner artifacts the templates use are computed first in a process pool; prompts are then
+    rendered by a thread pool. Prompts that fail to build are stored with their error. The first line of the bundle describes the grid, every other line is one prompt with its
+    metadata and the hashes of the prompt and of the PDDL files it was built from.
+    Returns the bundle path.
+    """
+    path = path or get_bundle_path(templates, domains, instances)
+    tasks = get_grid_tasks(domains, instances)
+    objs = sorted({obj for template in templates for obj in get_prompt_builder(template).artifacts})
+    if objs:
+        ARTIFACT_STORE.precompute(tasks, objs, max_workers=max_workers)
+    grid = [(template, task) for template in templates for task in tasks]
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor, gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+        header = {
+            "templates": templates,
+            "domains": domains,
+            "instances": instances,
+            "prompts": len(grid),
+            "builder": builder_fingerprint(templates),
+            "selection": selection_sha256(tasks),
+            "created": str(datetime.now()),
+        }
+        f.write(json.dumps(header) + "\n")
+        for record in executor.map(lambda item: compile_prompt(*item), grid):
+            f.write(json.dumps(record, default=str) + "\n")
+    os.replace(temp_path, path)
+    return path
+
+def read_header(path: str) -> dict:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.loads(next(f, "{}"))
+
+def is_current(path: str) -> bool:
+    """
+    Whether a bundle was compiled with the current prompt builders and artifact producers, for the
+    instances its grid currently selects.
+    """
+    try:
+        header = read_header(path)
+    except (OSError, ValueError):
+        return False
+    if not {"templates", "domains", "builder", "selection"} <= header.keys():
+        return False
+    return (header["builder"] == builder_fingerprint(header["templates"])
+            and header["selection"] == selection_sha256(get_grid_tasks(header["domains"], header.get("instances"))))
+
+def get_bundle(templates: list[str], domains: list[str], instances: int | None = None, max_workers: int | None = None) -> str:
+    """
+    Path of the bundle of a grid, compiled first if it is missing or stale.
+    """
+    path = get_bundle_path(templates, domains, instances)
+    if not os.path.exists(path) or not is_current(path):
+        path = precompile(templates, domains, instances, path, max_workers)
+    return path
+
+def read_bundle(path: str) -> Iterator[dict]:
+    """
+    Streams the prompt records of a bundle.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        next(f, None)
+        for line in f:
+            yield json.loads(line)
+
+def iter_bundle_prompts(path: str, templates: list[str] | None = None, domains: list[str] | None = None) -> Iterator[tuple[str, Task, str | ValueError, dict]]:
+    """
+    Yields the (template, task, prompt, prompt metadata) items of a bundle, in the form generate consumes.
+
+    A bundle compiled with other prompt builders or artifact producers, or for another instance
+    selection, is recompiled first. Records whose PDDL files changed since the bundle was compiled,
+    or whose prompt does not match its hash, are rebuilt from the current files.
+    """
+    if not is_current(path):
+        header = read_header(path)
+        print(f"Recompiling stale prompt bundle {path}.")
+        precompile(header["templates"], header["domains"], header.get("instances"), path)
+    for record in read_bundle(path):
+        if templates is not None and record["template"] not in templates:
+            continue
+        if domains is not None and record["domain"] not in domains:
+            continue
+        task = Task(
+            Domain(name=record["domain"], path=record["domain_path"]),
+            Instance(name=record["instance"], path=record["instance_path"]),
+        )
+        corrupt = "error" not in record and record.get("prompt_sha256") != sha256(record.get("prompt", ""))
+        if corrupt or input_hashes(task) != (record["domain_sha256"], record["instance_sha256"]):
+            print(f"Rebuilding stale prompt for {task} ({record['template']}); recompile the bundle to avoid this.")
+            record = compile_prompt(record["template"], task)
+        if "error" in record:
+            yield record["template"], task, ValueError(record["error"]), {}
+        else:
+            yield record["template"], task, record["prompt"], record["metadata"]
+
+if __name__ == "__main__":
+    instances = 20
+    templates = ["ordered_landmarks_feasible[unique+first_appearance]"]
+    domains = ["blocksworld_backtrack"]
+    path = get_bundle(templates, domains, instances)
+    print(f"Prompt bundle saved to {path}")
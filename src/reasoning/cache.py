@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from reasoning.settings import CACHE_DIR, RESPONSE_CACHE_FILE_NAME
+
+# Generation parameters that do not change the response (e.g. retry delays) and are left out of the cache key.
+IGNORED_GENERATION_PARAMS = {"wait_time"}
+
+def normalize_generation_config(generation_config: dict) -> str:
+    """
+    Canonical JSON encoding of a generation config: sorted keys, no whitespace, ignored parameters dropped.
+    """
+    config = {k: v for k, v in generation_config.items() if k not in IGNORED_GENERATION_PARAMS}
+    return json.dumps(config, sort_keys=True, separators=(",", ":"), default=str)
+
+def response_key(model_name: str, generation_config: dict, prompt: str, sample_id: int) -> str:
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    payload = json.dumps([model_name, normalize_generation_config(generation_config), prompt_hash, sample_id])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of model responses keyed by (model, generation config, prompt hash, sample id).
+
+    Entries are evicted least-recently-used first once the stored responses exceed max_bytes.
+    A single connection is shared by all threads and guarded by a lock.
+    """
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 2 * 1024 ** 3):
+        self.path : str = path or os.path.join(CACHE_DIR, RESPONSE_CACHE_FILE_NAME)
+        self.max_bytes : int = max_bytes
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, value TEXT, size INTEGER, last_access REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+
+    def get(self, model_name: str, generation_config: dict, prompt: str, sample_id: int) -> Optional[dict]:
+        key = response_key(model_name, generation_config, prompt, sample_id)
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, model_name: str, generation_config: dict, prompt: str, sample_id: int, response: dict) -> None:
+        key = response_key(model_name, generation_config, prompt, sample_id)
+        value = json.dumps(response, default=str)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, value, len(value), time.time()),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        while total > self.max_bytes:
+            rows = self.connection.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            # Evict only as many of the least recently used entries as needed to fit in max_bytes
+            evicted = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            self.connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
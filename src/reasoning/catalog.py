@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+from reasoning import settings
+from reasoning.pddl import parse_sexpr, parse_typed_list
+from reasoning.task import Domain, Instance, Task
+
+def count_objects(text: str) -> dict[str, int]:
+    """
+    Number of objects of each type declared in a PDDL problem (untyped objects count as "object").
+    """
+    counts = {}
+    try:
+        expr = parse_sexpr(text)
+    except ValueError:
+        return counts
+    for section in expr[1:]:
+        if isinstance(section, list) and section[:1] == [":objects"]:
+            for _, type_name in parse_typed_list(section[1:]):
+                counts[type_name] = counts.get(type_name, 0) + 1
+    return counts
+
+
+class CatalogEntry:
+    def __init__(self, name: str, path: str, id: int, subdirs: list[str], num_objects: int,
+                 objects_by_type: dict[str, int], sha256: str, size: int, mtime_ns: int):
+        self.name : str = name
+        self.path : str = path
+        self.id : int = id
+        self.subdirs : list[str] = subdirs
+        self.num_objects : int = num_objects
+        self.objects_by_type : dict[str, int] = objects_by_type
+        self.sha256 : str = sha256
+        self.size : int = size
+        self.mtime_ns : int = mtime_ns
+
+    def __str__(self):
+        fields = ", ".join(f"{key}={value}" for key, value in self.__dict__.items())
+        return f"{self.__class__.__name__}({fields})"
+
+
+class BenchmarkCatalog:
+    """
+    Index of the instances of a benchmark domain, persisted as catalog.json next to domain.pddl.
+
+    Each entry records the instance id, subdirectories, number of objects (per type) and file hash.
+    The catalog is rebuilt only when a directory of the instances tree or the size or mtime of an
+    instance changed, and then only the files whose size or mtime changed are read again. Tasks are created for selected entries only.
+    """
+    def __init__(self, domain: str, refresh: bool = False):
+        self.domain_name : str = domain
+        self.domain_dir : str = os.path.join(settings.BENCHMARKS_DIR, domain)
+        if not os.path.isdir(self.domain_dir):
+            raise ValueError(f"Domain directory '{self.domain_dir}' does not exist.")
+        domain_path = os.path.join(self.domain_dir, "domain.pddl")
+        if not os.path.isfile(domain_path):
+            raise ValueError(f"Domain file '{domain_path}' does not exist.")
+        self.instances_dir : str = os.path.join(self.domain_dir, "instances")
+        if not os.path.isdir(self.instances_dir):
+            raise ValueError(f"Instance directory '{self.instances_dir}' does not exist.")
+        self.domain : Domain = Domain(name=domain, path=domain_path)
+        self.path : str = os.path.join(self.domain_dir, settings.BENCHMARK_CATALOG_FILE_NAME)
+        self.dirs : dict[str, int] = {}
+        self.entries : list[CatalogEntry] = []
+        if refresh or not self._load():
+            self._build()
+
+    def _load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except ValueError:
+            return False
+        self.dirs = data.get("dirs", {})
+        self.entries = [CatalogEntry(**entry) for entry in data.get("entries", [])]
+        return bool(self.dirs) and self._dirs_unchanged() and self._entries_unchanged()
+
+    def _dirs_unchanged(self) -> bool:
+        for rel_dir, mtime_ns in self.dirs.items():
+            try:
+                if os.stat(os.path.join(self.instances_dir, rel_dir)).st_mtime_ns != mtime_ns:
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+    def _entries_unchanged(self) -> bool:
+        # Editing a file in place changes its own mtime, not its directory's
+        for entry in self.entries:
+            try:
+                stat = os.stat(entry.path)
+            except FileNotFoundError:
+                return False
+            if stat.st_size != entry.size or stat.st_mtime_ns != entry.mtime_ns:
+                return False
+        return True
+
+    def _build(self) -> None:
+        previous = {entry.path: entry for entry in self.entries}
+        self.dirs, self.entries = {}, []
+        for root, dirs, files in os.walk(self.instances_dir):
+            dirs.sort()
+            self.dirs[os.path.relpath(root, self.instances_dir)] = os.stat(root).st_mtime_ns
+            for instance_file in sorted(files):
+                if not instance_file.endswith('.pddl'):
+                    continue
+                instance_path = os.path.join(root, instance_file)
+                stat = os.stat(instance_path)
+                entry = previous.get(instance_path)
+                if entry is None or entry.size != stat.st_size or entry.mtime_ns != stat.st_mtime_ns:
+                    entry = self._index(instance_path, instance_file, stat)
+                self.entries.append(entry)
+        self._save()
+
+    def _index(self, instance_path: str, instance_file: str, stat: os.stat_result) -> CatalogEntry:
+        instance = Instance(name=instance_file.replace('.pddl', '').strip(), path=instance_path)
+        with open(instance_path, 'rb') as f:
+            content = f.read()
+        objects_by_type = count_objects(content.decode('utf-8', errors='replace'))
+        return CatalogEntry(
+            name=instance.name,
+            path=instance_path,
+            id=instance.id,
+            subdirs=instance.subdirs,
+            num_objects=sum(objects_by_type.values()),
+            objects_by_type=objects_by_type,
+            sha256=hashlib.sha256(content).hexdigest(),
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+        )
+
+    def _save(self) -> None:
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({"dirs": self.dirs, "entries": [entry.__dict__ for entry in self.entries]}, f, indent=1)
+        os.replace(temp_path, self.path)
+
+    def task(self, entry: CatalogEntry) -> Task:
+        return Task(self.domain, Instance(name=entry.name, path=entry.path))
+
+    def tasks(self, entries: Optional[list[CatalogEntry]] = None) -> list[Task]:
+        return [self.task(entry) for entry in (self.entries if entries is None else entries)]
+
+    def select(self,
+            min_objects: Optional[int] = None,
+            max_objects: Optional[int] = None,
+            object_type: Optional[str] = None,
+            subdir: Optional[str] = None) -> list[CatalogEntry]:
+        """
+        Entries, ordered by instance id, with a number of objects (of object_type, if given) within
+        [min_objects, max_objects] and, if given, located under subdir.
+        """
+        selected = []
+        for entry in self.entries:
+            count = entry.objects_by_type.get(object_type, 0) if object_type else entry.num_objects
+            if min_objects is not None and count < min_objects:
+                continue
+            if max_objects is not None and count > max_objects:
+                continue
+            if subdir is not None and subdir not in entry.subdirs:
+                continue
+            selected.append(entry)
+        return sorted(selected, key=lambda entry: entry.id)
+
+    def last(self, n: Optional[int], **filters) -> list[CatalogEntry]:
+        """
+        The n selected entries with the highest instance ids, in increasing id order; every selected
+        entry if n is 0 or None.
+        """
+        selected = self.select(**filters)
+        return selected[-min(len(selected), n):] if n else selected
@@ -3,136 +3,266 @@ import yaml
 import tqdm
 import os
 import reasoning.models as models
-from reasoning.task import Task, get_tasks
+from reasoning.task import Task
+from reasoning.catalog import BenchmarkCatalog
 from reasoning.prompt import get_prompt_builder, PromptBuilder
 from reasoning.utils import from_config
+from reasoning.cache import ResponseCache
 import logging
-from reasoning.settings import EXPERIMENTS_DIR, SAMPLE_FILE_NAME, PROMPT_FILE_NAME
+import sqlite3
+from reasoning.settings import EXPERIMENTS_DIR, SAMPLE_FILE_NAME, PROMPT_FILE_NAME, METADATA_FILE_NAME, METADATA_JOURNAL_FILE_NAME
+from reasoning.journal import MetadataJournal
+from reasoning.bundle import iter_bundle_prompts, get_bundle
+from reasoning.store import RESULTS_STORE
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator
 
-def save_model_metadata(df: pd.DataFrame, path: str):
-    import os
-    try:
-        # Check if file exists
-        if os.path.exists(path):
-            # Load existing data
-            existing_df = pd.read_csv(path)
-            
-            # Create a composite key for matching rows
-            key_columns = ["template", "domain", "instance", "sample_id"]
-            
-            # Merge DataFrames based on key columns
-            # This will update existing rows and add new ones
-            merged_df = pd.concat([existing_df, df])
-            merged_df = merged_df.drop_duplicates(subset=key_columns, keep='last')
-            
-            # Save the merged DataFrame
-            merged_df.to_csv(path, index=False)
+def save_model_metadata(df: pd.DataFrame, experiment: str, model_dir: str):
+    """
+    Appends sample metadata to the results store and refreshes the model's metadata.csv from it.
+    """
+    path = os.path.join(EXPERIMENTS_DIR, experiment, model_dir, METADATA_FILE_NAME)
+    filters = {"experiment": experiment, "model": model_dir}
+    # Import a metadata.csv written before the store existed, so its rows are kept
+    if os.path.exists(path) and not RESULTS_STORE.partitions("metadata", **filters):
+        RESULTS_STORE.append("metadata", pd.read_csv(path).assign(**filters))
+    RESULTS_STORE.append("metadata", df.assign(**filters))
+    RESULTS_STORE.compact("metadata", **filters)
+    merged_df = RESULTS_STORE.read("metadata", **filters).drop(columns=list(filters))
+    merged_df.to_csv(path, index=False)
+
+
+def compact_metadata_journal(journal: MetadataJournal, experiment: str, model_dir: str):
+    """
+    Saves the records of a model's metadata journal with save_model_metadata and empties the journal.
+    """
+    records = journal.records()
+    if records:
+        save_model_metadata(pd.DataFrame(records), experiment, model_dir)
+        journal.truncate()
+
+def write_sample(sample_log_file: str, sample_id: int, template: str, task: Task, response: dict | Exception, started: datetime, cached: bool = False) -> dict | None:
+    """
+    Writes a model response (or the error raised while generating it) to sample_log_file.
+
+    Returns the sample metadata, or None if the generation failed.
+    """
+    metadata = None
+    with open(sample_log_file, 'w') as sample_file:
+        sample_file.write(f"[{started}] Generating response for sample {sample_id}.\n")
+        if isinstance(response, Exception):
+            sample_file.write(f"[{datetime.now()}] Error during sample generation: {response}\n")
+            return None
+
+        if cached:
+            sample_file.write(f"[{datetime.now()}] Response for sample {sample_id} loaded from cache.\n")
         else:
-            # File doesn't exist, create it
-            df.to_csv(path, index=False)
-    except Exception as e:
-        print(f"Error saving metadata: {e}")
-        # Fallback to simple save
-        df.to_csv(path, index=False)
+            sample_file.write(f"[{datetime.now()}] Response for sample {sample_id} generated successfully.\n")
+
+        sample_file.write(f"[{datetime.now()}] Response:\n")
+        sample_file.write(f"<response>\n{response['response']}\n</response>\n")
+
+        metadata = {
+            "template": template,
+            "domain": task.domain.name,
+            "instance": task.instance.name,
+            "sample_id": sample_id,
+            **response['metadata'],
+            "cached": cached,
+        }
+        if cached:
+            # No request was made for a cached response, so it must not count towards the model's usage
+            metadata.update({
+                key: 0 for key, value in response['metadata'].items()
+                if (key == "num_requests" or "token" in key) and isinstance(value, (int, float)) and not isinstance(value, bool)
+            })
+
+        sample_file.write(f"[{datetime.now()}] Metadata:\n")
+        sample_file.write(f"<metadata>\n{str(metadata)}\n</metadata>\n")
 
+        if "thought" in response:
+            thought = response["thought"]
+            sample_file.write(f"[{datetime.now()}] Thought Process:\n")
+            sample_file.write(f"<thought>\n{thought}\n</thought>\n")
+    return metadata
 
 
-def generate(model: models.Model, tasks: list[Task], template: str, samples: int, experiment: str, model_dir: str, **kwargs):
+def cache_response(cache: ResponseCache, model: models.Model, prompt: str, sample_id: int, response: dict, **kwargs) -> None:
     """
-    Generates responses for a list of tasks and saves them to a structured directory.
+    Stores a response in the cache; a cache failure (e.g. a locked or full database) is reported but never loses the response.
+    """
+    try:
+        cache.put(model.name, kwargs, prompt, sample_id, response)
+    except sqlite3.Error as e:
+        print(f"Failed to cache response for sample {sample_id}: {e}")
 
-    New structure: <experiment>/<model>/<template>/<domain>/<instance>/
-    - prompt.log: Contains the prompt and its metadata.
-    - sample_<num>.log: Contains a single model response and its metadata.
+
+def generate_sample(model: models.Model, prompt: str, sample_log_file: str, sample_id: int, template: str, task: Task, cache: ResponseCache | None = None, **kwargs) -> dict | None:
+    """
+    Generates a single sample for a prompt with Model.generate_response and writes it to sample_log_file.
     """
+    started = datetime.now()
+    try:
+        response = model.generate_response(prompt=prompt, **kwargs)
+    except RuntimeError as e:
+        response = e
+    if cache and not isinstance(response, Exception):
+        cache_response(cache, model, prompt, sample_id, response, **kwargs)
+    return write_sample(sample_log_file, sample_id, template, task, response, started)
+
+
+def generate_batch_samples(model: models.Model, work_items: list[tuple[str, Task, int, str, str]], cache: ResponseCache | None = None, **kwargs) -> list[dict]:
+    """
+    Generates the samples of work_items, (template, task, sample_id, prompt, sample_log_file) tuples, with a single Model.generate_batch call.
+    """
+    started = datetime.now()
+    try:
+        responses = model.generate_batch([prompt for _, _, _, prompt, _ in work_items], **kwargs)
+    except Exception as e:
+        # A failure of the batch as a whole fails each of its samples, not the whole run
+        responses = [RuntimeError(f"Batch generation failed: {e}")] * len(work_items)
     metadata_list = []
-    for task in tqdm.tqdm(tasks, desc="Generating content", unit="task"):
-        # Define the new base directory for the instance
-        instance_dir = os.path.join(
-            EXPERIMENTS_DIR,
-            experiment,
-            model_dir,
-            template,
-            task.domain.name,
-            task.instance.name, # New structure uses instance name as the directory
-        )
-        os.makedirs(instance_dir, exist_ok=True)
-        prompt_log_file = os.path.join(instance_dir, PROMPT_FILE_NAME)
+    for (template, task, i, prompt, sample_log_file), response in zip(work_items, responses):
+        if isinstance(response, Exception) and not isinstance(response, RuntimeError):
+            raise response
+        if cache and not isinstance(response, Exception):
+            cache_response(cache, model, prompt, i, response, **kwargs)
+        metadata = write_sample(sample_log_file, i, template, task, response, started)
+        if metadata:
+            metadata_list.append(metadata)
+    return metadata_list
+
+
+def build_prompts(tasks: list[Task], template: str) -> Iterator[tuple[str, Task, str | ValueError, dict]]:
+    """
+    Builds the prompt of every task and yields (template, task, prompt, prompt metadata); a prompt
+    that cannot be built is yielded as the ValueError raised while building it.
+    """
+    prompt_builder : PromptBuilder = get_prompt_builder(template)
+    for task in tasks:
         try:
-            # Build the prompt
-            prompt_builder : PromptBuilder = get_prompt_builder(template)
             prompt = prompt_builder.build(task)
+        except ValueError as e:
+            yield template, task, e, {}
+            continue
+        yield template, task, prompt, prompt_builder.get_metadata(task)
 
-            # Save the prompt and its metadata to prompt.log
-            if not os.path.exists(prompt_log_file):
-                with open(prompt_log_file, 'w') as prompt_file:
-                    prompt_file.write(f"[{datetime.now()}] Task: {task}\n")
-                    prompt_file.write(f"[{datetime.now()}] Model: {model.name}\n")
-                    prompt_file.write(f"[{datetime.now()}] Generation Parameters: {kwargs}\n")
-                    prompt_file.write(f"[{datetime.now()}]\nPrompt Metadata:\n")
-                    prompt_file.write(f"<metadata>\n{prompt_builder.get_metadata(task)}\n</metadata>\n\n")
-                    prompt_file.write(f"[{datetime.now()}]\nPrompt:\n")
-                    prompt_file.write(f"<prompt>\n{prompt}\n</prompt>\n")
 
-            # Generate and save each sample
-            for i in range(1, samples + 1):
-                sample_log_file = os.path.join(instance_dir, SAMPLE_FILE_NAME.format(i))
-                if os.path.exists(sample_log_file):
-                    continue
+def generate(model: models.Model, tasks: list[Task], template: str, samples: int, experiment: str, model_dir: str, max_in_flight: int = 1, batch_size: int | None = None, cache: ResponseCache | None = None, **kwargs):
+    """
+    Generates responses for a list of tasks and saves them to a structured directory.
 
-                sample_file = open(sample_log_file, 'w')
-                if not sample_file:
-                    continue
+    New structure: <experiment>/<model>/<template>/<domain>/<instance>/
+    - prompt.log: Contains the prompt and its metadata.
+    - sample_<num>.log: Contains a single model response and its metadata.
 
-                try:
-                    sample_file.write(f"[{datetime.now()}] Generating response for sample {i}.\n")
-                    response = model.generate_response(prompt=prompt, **kwargs)
-                    sample_file.write(f"[{datetime.now()}] Response for sample {i} generated successfully.\n")
-
-                    sample_file.write(f"[{datetime.now()}] Response:\n")
-                    sample_file.write(f"<response>\n{response['response']}\n</response>\n")
-
-                    metadata = {
-                        "template": template,
-                        "domain": task.domain.name,
-                        "instance": task.instance.name,
-                        "sample_id": i,
-                        **response['metadata']
-                    }
-                    metadata_list.append(metadata)
+    Prompts are built first; the missing (task, sample_id) pairs are then generated
+    concurrently, with at most max_in_flight requests to the model at any time.
+    If batch_size is given, work items are grouped into batches of batch_size prompts and
+    each batch is sent through Model.generate_batch as a single request; for local models
+    that batch natively, keep max_in_flight at 1.
+    Samples whose sample_<num>.log already exists are skipped, and samples found in the
+    response cache (same model, generation config, prompt and sample id) are written
+    without calling the model.
+    The metadata of each completed sample is appended to the model's metadata.jsonl journal,
+    which is compacted into metadata.csv once all samples are done.
+    """
+    generate_from_prompts(model, build_prompts(tasks, template), samples, experiment, model_dir,
+                          max_in_flight=max_in_flight, batch_size=batch_size, cache=cache, **kwargs)
 
-                    sample_file.write(f"[{datetime.now()}] Metadata:\n")
-                    sample_file.write(f"<metadata>\n{str(metadata)}\n</metadata>\n")
 
-                    if "thought" in response:
-                        thought = response["thought"]
-                        sample_file.write(f"[{datetime.now()}] Thought Process:\n")
-                        sample_file.write(f"<thought>\n{thought}\n</thought>\n")
+def generate_from_bundle(model: models.Model, bundle_path: str, samples: int, experiment: str, model_dir: str, templates: list[str] | None = None, domains: list[str] | None = None, max_in_flight: int = 1, batch_size: int | None = None, cache: ResponseCache | None = None, **kwargs):
+    """
+    Like generate, but streams precompiled prompts from a bundle (see reasoning.bundle), optionally
+    restricted to some templates and domains.
+    """
+    generate_from_prompts(model, iter_bundle_prompts(bundle_path, templates, domains), samples, experiment, model_dir,
+                          max_in_flight=max_in_flight, batch_size=batch_size, cache=cache, **kwargs)
 
-                except RuntimeError as e:
-                    sample_file.write(f"[{datetime.now()}] Error during sample generation: {e}\n")
 
-                finally:
-                    sample_file.close()
+def generate_from_prompts(model: models.Model, prompts: Iterable[tuple[str, Task, str | ValueError, dict]], samples: int, experiment: str, model_dir: str, max_in_flight: int = 1, batch_size: int | None = None, cache: ResponseCache | None = None, **kwargs):
+    """
+    Generates samples for (template, task, prompt, prompt metadata) items; see generate.
+    """
+    # Metadata of every completed sample is journaled right away, so a crash loses none of it
+    with MetadataJournal(os.path.join(EXPERIMENTS_DIR, experiment, model_dir, METADATA_JOURNAL_FILE_NAME)) as journal:
+        try:
+            work_items = []
+            for template, task, prompt, prompt_metadata in tqdm.tqdm(prompts, desc="Building prompts", unit="task"):
+                # Define the new base directory for the instance
+                instance_dir = os.path.join(
+                    EXPERIMENTS_DIR,
+                    experiment,
+                    model_dir,
+                    template,
+                    task.domain.name,
+                    task.instance.name, # New structure uses instance name as the directory
+                )
+                os.makedirs(instance_dir, exist_ok=True)
+                prompt_log_file = os.path.join(instance_dir, PROMPT_FILE_NAME)
+                if isinstance(prompt, Exception):
+                    with open(prompt_log_file + ".err", 'w') as error_f:
+                        error_f.write(f"[{datetime.now()}] Error building prompt for task {task}: {prompt}\n")
+                    continue
 
-        except ValueError as e:
-            with open(prompt_log_file + ".err", 'w') as error_f:
-                error_f.write(f"[{datetime.now()}] Error building prompt for task {task}: {e}\n")
+                # Save the prompt and its metadata to prompt.log
+                if not os.path.exists(prompt_log_file):
+                    with open(prompt_log_file, 'w') as prompt_file:
+                        prompt_file.write(f"[{datetime.now()}] Task: {task}\n")
+                        prompt_file.write(f"[{datetime.now()}] Model: {model.name}\n")
+                        prompt_file.write(f"[{datetime.now()}] Generation Parameters: {kwargs}\n")
+                        prompt_file.write(f"[{datetime.now()}]\nPrompt Metadata:\n")
+                        prompt_file.write(f"<metadata>\n{prompt_metadata}\n</metadata>\n\n")
+                        prompt_file.write(f"[{datetime.now()}]\nPrompt:\n")
+                        prompt_file.write(f"<prompt>\n{prompt}\n</prompt>\n")
 
-    # Save all collected metadata to a single CSV file for the model
-    if metadata_list:
-        metadata_df = pd.DataFrame(metadata_list)
-        save_model_metadata(
-            metadata_df, 
-            os.path.join(EXPERIMENTS_DIR, experiment, model_dir, "metadata.csv")
-        )
+                for i in range(1, samples + 1):
+                    sample_log_file = os.path.join(instance_dir, SAMPLE_FILE_NAME.format(i))
+                    if os.path.exists(sample_log_file):
+                        continue
+                    cached = cache.get(model.name, kwargs, prompt, i) if cache else None
+                    if cached:
+                        metadata = write_sample(sample_log_file, i, template, task, cached, datetime.now(), cached=True)
+                        if metadata:
+                            journal.append(metadata)
+                        continue
+                    work_items.append((template, task, i, prompt, sample_log_file))
+
+            # Generate and save each sample
+            with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+                if batch_size:
+                    futures = {
+                        executor.submit(generate_batch_samples, model, work_items[j:j + batch_size], cache, **kwargs): len(work_items[j:j + batch_size])
+                        for j in range(0, len(work_items), batch_size)
+                    }
+                else:
+                    futures = {
+                        executor.submit(generate_sample, model, prompt, sample_log_file, i, template, task, cache, **kwargs): 1
+                        for template, task, i, prompt, sample_log_file in work_items
+                    }
+                with tqdm.tqdm(total=len(work_items), desc="Generating content", unit="sample") as progress:
+                    for future in as_completed(futures):
+                        metadata = future.result()
+                        for record in metadata if isinstance(metadata, list) else [metadata]:
+                            if record:
+                                journal.append(record)
+                        progress.update(futures[future])
+        finally:
+            # Materialize the journal (including records left by an interrupted run) into metadata.csv,
+            # even if generation failed
+            compact_metadata_journal(journal, experiment, model_dir)
 
 if __name__ == "__main__":
     experiment = "blocksworld_backtracking_reasoning"
     samples = 1
     instances = 20
+    max_in_flight = 8
+    batch_size = None
+    cache = ResponseCache()
+    # Build every prompt of the grid up front and stream them from a bundle during generation
+    use_prompt_bundle = True
     templates = ["ordered_landmarks_feasible"]
     tips = [
         "unique+first_appearance", 
@@ -151,6 +281,10 @@ if __name__ == "__main__":
                     new_templates.append(template)
         templates = new_templates
 
+    bundle_path = None
+    if use_prompt_bundle:
+        bundle_path = get_bundle(templates, domains, instances)
+
     for config_path in config_paths:
         config = from_config(config_path)
         model_config = config.get("model_config", {})
@@ -160,11 +294,26 @@ if __name__ == "__main__":
             model = models.get_model_from_model_config(**model_config)
         except Exception as e:
             raise ValueError(f"Error initializing model with model_config: {model_config}. Error: {e}")
+        if bundle_path:
+            print(f"Experiment: {experiment}\nModel: {model.name}\nPrompt bundle: {bundle_path}\nSamples: {samples}\nGeneration Config: {generation_config}\n")
+            generate_from_bundle(
+                model=model,
+                bundle_path=bundle_path,
+                samples=samples,
+                experiment=experiment,
+                model_dir=model_dir,
+                max_in_flight=max_in_flight,
+                batch_size=batch_size,
+                cache=cache,
+                **generation_config
+            )
+            print(f"Model stats: {model.get_stats()}\n")
+            continue
         for template in templates:            
             for domain in domains:
                 try:
-                    tasks = sorted(get_tasks(domain))
-                    tasks = tasks[-min(len(tasks), instances):]
+                    catalog = BenchmarkCatalog(domain)
+                    tasks = catalog.tasks(catalog.last(instances))
                 except ValueError as e:
                     raise ValueError(f"Error getting tasks for domain '{domain}': {e}")
                 print(f"Experiment: {experiment}\nModel: {model.name}\nDomain: {domain}\nTemplate: {template}\nSamples: {samples}\nGeneration Config: {generation_config}\n")
@@ -175,5 +324,9 @@ if __name__ == "__main__":
                     samples=samples,
                     experiment=experiment,
                     model_dir=model_dir,
+                    max_in_flight=max_in_flight,
+                    batch_size=batch_size,
+                    cache=cache,
                     **generation_config
                 )
+        print(f"Model stats: {model.get_stats()}\n")
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import re
+from typing import Iterable, Optional
+
+from reasoning.settings import EXPERIMENTS_DIR, CACHE_DIR, EXPERIMENT_INDEX_FILE_NAME
+
+# Directory levels below EXPERIMENTS_DIR: <experiment>/<model>/<template>/<domain>/<instance>/<file>
+LEVELS = ("experiment", "model", "template", "domain", "instance")
+
+FILE_PATTERN = re.compile(r"^(?:(?P<prompt>prompt\.log)|sample_(?P<sample_id>\d+)\.(?P<extension>log|val|val\.json))$")
+SAMPLE_FILE_KINDS = {"log": "sample", "val": "val", "val.json": "verdict"}
+
+def classify(file_name: str) -> tuple[str, Optional[int]]:
+    """
+    Returns the kind of a file in an instance directory ("prompt", "sample", "val", "verdict" or "other") and its sample id.
+    """
+    match = FILE_PATTERN.match(file_name)
+    if match is None:
+        return "other", None
+    if match.group("prompt"):
+        return "prompt", None
+    return SAMPLE_FILE_KINDS[match.group("extension")], int(match.group("sample_id"))
+
+
+class LogRecord:
+    def __init__(self, experiment: str, model: str, template: str, domain: str, instance: str, path: str, file_name: str | None = None):
+        self.experiment : str = experiment
+        self.model : str = model
+        self.template : str = template
+        self.domain : str = domain
+        self.instance : str = instance
+        self.path : str = path
+        self.kind, self.sample_id = classify(file_name or os.path.basename(path))
+
+    def __str__(self):
+        fields = ", ".join(f"{key}={value}" for key, value in self.__dict__.items())
+        return f"{self.__class__.__name__}({fields})"
+
+
+def _as_filter(value: None | str | Iterable[str]) -> Optional[set[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return {value}
+    return set(value)
+
+
+class ExperimentIndex:
+    """
+    Index of the prompt, sample and validation files of the experiments tree.
+
+    The tree is walked with os.scandir, descending only into directories that match the filters.
+    With a manifest (kept in CACHE_DIR, one per indexed root), the listing of every directory is
+    cached on disk together with the directory mtime, and directories whose mtime did not change
+    are not listed again.
+    """
+    def __init__(self, root: str = EXPERIMENTS_DIR, use_manifest: bool = True):
+        self.root : str = root
+        self.manifest_path : Optional[str] = None
+        if use_manifest:
+            root_id = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:12]
+            self.manifest_path = os.path.join(CACHE_DIR, EXPERIMENT_INDEX_FILE_NAME.replace(".json", f"-{root_id}.json"))
+        self.listings : dict[str, dict] = {}
+        self.dirty : bool = False
+        if self.manifest_path and os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r') as f:
+                    self.listings = json.load(f)
+            except ValueError:
+                self.listings = {}
+
+    def _list(self, path: str) -> tuple[list[str], list[str]]:
+        """
+        Returns the (subdirectories, files) of path, from the manifest if the directory is unchanged.
+        """
+        mtime = os.stat(path).st_mtime_ns
+        cached = self.listings.get(path)
+        if cached is not None and cached["mtime"] == mtime:
+            return cached["dirs"], cached["files"]
+        dirs, files = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    dirs.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+        dirs.sort()
+        files.sort()
+        self.listings[path] = {"mtime": mtime, "dirs": dirs, "files": files}
+        self.dirty = True
+        return dirs, files
+
+    def records(self,
+            experiment: None | str | Iterable[str] = None,
+            model: None | str | Iterable[str] = None,
+            template: None | str | Iterable[str] = None,
+            domain: None | str | Iterable[str] = None,
+            kinds: None | str | Iterable[str] = None) -> list[LogRecord]:
+        """
+        Returns the records of every file matching the filters; each filter is a name or a collection of names.
+        """
+        filters = [_as_filter(f) for f in (experiment, model, template, domain, None)]
+        kinds = _as_filter(kinds)
+        records = []
+        if not os.path.isdir(self.root):
+            return records
+
+        def walk(path: str, level: int, names: tuple[str, ...]):
+            dirs, files = self._list(path)
+            if level == len(LEVELS):
+                for file_name in files:
+                    record = LogRecord(*names, os.path.join(path, file_name), file_name)
+                    if kinds is None or record.kind in kinds:
+                        records.append(record)
+                return
+            allowed = filters[level]
+            for name in dirs:
+                if allowed is None or name in allowed:
+                    walk(os.path.join(path, name), level + 1, names + (name,))
+
+        walk(self.root, 0, ())
+        self.save()
+        return records
+
+    def save(self) -> None:
+        if not self.manifest_path or not self.dirty:
+            return
+        # Drop listings of directories that no longer exist
+        self.listings = {path: listing for path, listing in self.listings.items() if os.path.isdir(path)}
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.listings, f)
+        os.replace(temp_path, self.manifest_path)
+        self.dirty = False
@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
+
+def read_journal(path: str) -> Iterator[dict]:
+    """
+    Yields the records of a JSON Lines journal, skipping a last line left incomplete by a crash.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def drop_partial_line(path: str, chunk_size: int = 64 * 1024) -> None:
+    """
+    Truncates a journal after its last newline, so a line left incomplete by a crash is not continued by the next append.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - chunk_size)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+
+class MetadataJournal:
+    """
+    Append-only JSON Lines journal of sample metadata.
+
+    Every record is written and flushed as soon as it is appended, so it can be read live;
+    fsync is batched to once every fsync_every records or fsync_interval seconds, whichever
+    comes first. Appends are thread-safe. A partial last line left by a crash is dropped on open.
+    """
+    def __init__(self, path: str, fsync_every: int = 32, fsync_interval: float = 1.0):
+        self.path : str = path
+        self.fsync_every : int = fsync_every
+        self.fsync_interval : float = fsync_interval
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        drop_partial_line(path)
+        self.file = open(path, 'a')
+        self.pending : int = 0
+        self.synced : float = time.monotonic()
+        self.lock = threading.Lock()
+
+    def append(self, record: dict) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.pending += 1
+            if self.pending >= self.fsync_every or time.monotonic() - self.synced >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self) -> None:
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.synced = time.monotonic()
+
+    def records(self) -> list[dict]:
+        with self.lock:
+            self.file.flush()
+        return list(read_journal(self.path))
+
+    def truncate(self) -> None:
+        """
+        Drops every record, once they have been compacted elsewhere.
+        """
+        with self.lock:
+            self.file.truncate(0)
+            self._sync()
+
+    def close(self) -> None:
+        with self.lock:
+            if self.file.closed:
+                return
+            self._sync()
+            self.file.close()
+
+    def __enter__(self) -> "MetadataJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> Optional[bool]:
+        self.close()
+        return None
@@ -1,9 +1,12 @@
 import pandas as pd
 import os
 import numpy as np
+import zlib
+from scipy.special import gammaln
 
 # --- Constants (placeholders for your settings) ---
-from reasoning.settings import EXPERIMENTS_DIR, VALIDATION_FILE_NAME, PASS_AT_K_METRIC_FILE_NAME
+from reasoning.settings import EXPERIMENTS_DIR, VALIDATION_FILE_NAME, PASS_AT_K_METRIC_FILE_NAME, METRICS_BY_ATTEMPT_FILE_NAME
+from reasoning.store import RESULTS_STORE
 
 
 def pass_at_k(n, c, k):
@@ -21,52 +24,64 @@ def pass_at_k(n, c, k):
         return 1.0
     return 1.0 - np.prod(1.0 - k / np.arange(n - c + 1, n + 1))
 
-def compute_pass_at_k(experiment_path):
+def pass_at_k_matrix(n: np.ndarray, c: np.ndarray, max_k: int) -> np.ndarray:
     """
-    Reads validation data for a single experiment, calculates metrics,
-    and returns a processed DataFrame.
+    Vectorized pass_at_k: returns the (len(n), max_k) matrix of pass@1..pass@max_k for every (n, c) pair.
+    The ratio C(n-c, k) / C(n, k) is computed in log space, so large sample counts do not overflow.
     """
-    if not os.path.exists(experiment_path):
-        raise FileNotFoundError(f"Experiment path {experiment_path} does not exist.")
+    n = np.asarray(n, dtype=float)[:, None]
+    c = np.asarray(c, dtype=float)[:, None]
+    k = np.arange(1, max_k + 1, dtype=float)[None, :]
+    failed = n - c
+    # Clamp the arguments where the result is set below anyway, so gammaln stays finite
+    defined = (k <= failed) & (k <= n)
+    log_ratio = (
+        gammaln(np.where(defined, failed + 1, 1)) - gammaln(np.where(defined, failed - k + 1, 1))
+        - gammaln(np.where(defined, n + 1, 1)) + gammaln(np.where(defined, n - k + 1, 1))
+    )
+    result = np.where(defined, 1.0 - np.exp(log_ratio), 1.0)
+    return np.where((n < k) | (n == 0), np.nan, result)
+
+def bootstrap_ci(values: np.ndarray, n_bootstrap: int = 1000, confidence: float = 0.95, rng: np.random.Generator | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Percentile bootstrap confidence interval of the column means of values (instances x metrics).
+    All resamples are drawn at once as multinomial instance counts.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    m = len(values)
+    counts = rng.multinomial(m, np.full(m, 1.0 / m), size=n_bootstrap)
+    means = counts @ values / m
+    alpha = (1.0 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1.0 - alpha], axis=0)
+    return low, high
+
+def load_validation_results(experiment_path: str, columns: list[str]) -> pd.DataFrame:
+    """
+    Loads only the given columns of an experiment's validation results: from the results store when it
+    holds the experiment, otherwise from the experiment's validation CSV.
+    """
+    experiment = os.path.basename(os.path.normpath(experiment_path))
+    if RESULTS_STORE.partitions("validation", experiment=experiment):
+        return RESULTS_STORE.read("validation", columns=columns, experiment=experiment)
 
     validation_path = os.path.join(experiment_path, VALIDATION_FILE_NAME)
     if not os.path.exists(validation_path):
         raise FileNotFoundError(f"Validation file {validation_path} does not exist.")
-    
-    df = pd.read_csv(validation_path)
-    # Ensure 'valid' column is boolean
-    df['valid'] = pd.to_numeric(df['valid'], errors='coerce').fillna(0).astype(bool)
-
-    # Group by the specified columns to aggregate results
-    group_keys = ['experiment', 'domain', 'model', 'template', 'instance']
-    grouped = df.groupby(group_keys)
-    
-    # Assuming 'instance_id' is the column that identifies unique instances
-    # If it's a different column, replace 'instance_id' with the correct column name
-    agg_funcs = {
-        'valid': ['sum', 'count'],
-        'num_action_landmarks': 'mean',
-        'num_action_landmarks_used': 'mean'
-    }
-    results_df = grouped.agg(agg_funcs)
-
-    # Flatten the multi-level column index and rename columns for clarity
-    results_df.columns = ['correct_samples', 'total_samples', 'num_action_landmarks', 'num_action_landmarks_used']
-    results_df = results_df.reset_index()
+    return pd.read_csv(validation_path, usecols=columns)
 
+def aggregate_pass_at_k(results_df: pd.DataFrame, max_k: int, n_bootstrap: int = 1000, confidence: float = 0.95, seed: int = 0) -> pd.DataFrame:
+    """
+    Aggregates per-instance results (correct_samples, total_samples and mean landmark counts of every
+    experiment, domain, model, template and instance) into the pass@k metrics of each template.
+    """
     # Calculate pass@k for each k up to the maximum number of samples
-    max_k = df['sample_id'].max()
     if max_k > 0:
         print(f"Calculating pass@k for k up to {max_k}...")
-        for k in range(1, max_k + 1):
-            results_df[f'pass@{k}'] = results_df.apply(
-                lambda row: pass_at_k(
-                    n=row['total_samples'],
-                    c=row['correct_samples'],
-                    k=k
-                ),
-                axis=1
-            )
+        pass_k = pass_at_k_matrix(results_df['total_samples'].to_numpy(), results_df['correct_samples'].to_numpy(), max_k)
+        results_df = pd.concat([
+            results_df,
+            pd.DataFrame(pass_k, columns=[f'pass@{k}' for k in range(1, max_k + 1)], index=results_df.index)
+        ], axis=1)
 
     # Group by experiment, domain, model, template to aggregate across instances
     group_cols = ['experiment', 'domain', 'model', 'template']
@@ -88,6 +103,22 @@ def compute_pass_at_k(experiment_path):
     # Perform the aggregation
     aggregated_df = results_df.groupby(group_cols).agg(agg_dict)
 
+    # Bootstrap the mean over instances of every pass@k, for all k at once
+    if n_bootstrap and max_k > 0:
+        pass_k_cols = [f'pass@{k}' for k in range(1, max_k + 1)]
+        ci_rows = {}
+        for group, group_df in results_df.groupby(group_cols):
+            # Seeded per group, so a group's interval does not depend on which other groups are aggregated
+            rng = np.random.default_rng([seed, zlib.crc32("|".join(map(str, group)).encode("utf-8"))])
+            low, high = bootstrap_ci(group_df[pass_k_cols].to_numpy(), n_bootstrap, confidence, rng)
+            ci_rows[group] = [*low, *high]
+        ci_df = pd.DataFrame.from_dict(
+            ci_rows, orient='index',
+            columns=[f'ci_low@{k}' for k in range(1, max_k + 1)] + [f'ci_high@{k}' for k in range(1, max_k + 1)]
+        )
+        ci_df.index = pd.MultiIndex.from_tuples(ci_df.index, names=group_cols)
+        aggregated_df = aggregated_df.join(ci_df)
+
     # Rename columns for clarity
     aggregated_df.rename(columns={'instance': 'num_instances'}, 
                         inplace=True)
@@ -102,14 +133,53 @@ def compute_pass_at_k(experiment_path):
     # Reorder columns to ensure accuracy appears before pass@k metrics
     cols = list(aggregated_df.columns)
     pass_k_cols = [col for col in cols if col.startswith('pass@')]
-    other_cols = [col for col in cols if not col.startswith('pass@')]
-    new_order = [col for col in other_cols] + pass_k_cols
+    ci_cols = [col for col in cols if col.startswith('ci_')]
+    other_cols = [col for col in cols if not col.startswith('pass@') and not col.startswith('ci_')]
+    new_order = [col for col in other_cols] + pass_k_cols + ci_cols
     aggregated_df = aggregated_df[new_order]
     
     # Round all float columns to two decimal places
     float_cols = aggregated_df.select_dtypes(include=['float']).columns
     aggregated_df[float_cols] = aggregated_df[float_cols].round(2)
 
+    return aggregated_df
+
+def compute_pass_at_k(experiment_path, n_bootstrap: int = 1000, confidence: float = 0.95, seed: int = 0):
+    """
+    Reads validation data for a single experiment, calculates metrics,
+    and returns a processed DataFrame.
+    Alongside each pass@k, ci_low@k and ci_high@k bound its bootstrap confidence interval
+    over instances (n_bootstrap resamples; 0 disables them).
+    """
+    if not os.path.exists(experiment_path):
+        raise FileNotFoundError(f"Experiment path {experiment_path} does not exist.")
+
+    df = load_validation_results(experiment_path, [
+        'experiment', 'domain', 'model', 'template', 'instance', 'sample_id',
+        'valid', 'num_action_landmarks', 'num_action_landmarks_used'
+    ])
+    # Ensure 'valid' column is boolean
+    df['valid'] = pd.to_numeric(df['valid'], errors='coerce').fillna(0).astype(bool)
+
+    # Group by the specified columns to aggregate results
+    group_keys = ['experiment', 'domain', 'model', 'template', 'instance']
+    grouped = df.groupby(group_keys)
+    
+    # Assuming 'instance_id' is the column that identifies unique instances
+    # If it's a different column, replace 'instance_id' with the correct column name
+    agg_funcs = {
+        'valid': ['sum', 'count'],
+        'num_action_landmarks': 'mean',
+        'num_action_landmarks_used': 'mean'
+    }
+    results_df = grouped.agg(agg_funcs)
+
+    # Flatten the multi-level column index and rename columns for clarity
+    results_df.columns = ['correct_samples', 'total_samples', 'num_action_landmarks', 'num_action_landmarks_used']
+    results_df = results_df.reset_index()
+
+    max_k = int(df['sample_id'].max())
+    aggregated_df = aggregate_pass_at_k(results_df, max_k, n_bootstrap, confidence, seed)
     aggregated_df.to_csv(os.path.join(experiment_path, PASS_AT_K_METRIC_FILE_NAME), index=False)
 
     return aggregated_df
@@ -209,11 +279,10 @@ def compute_metrics_by_attempt(experiment_path : str) -> pd.DataFrame:
     if not os.path.exists(experiment_path):
         raise FileNotFoundError(f"Experiment path {experiment_path} does not exist.")
 
-    validation_path = os.path.join(experiment_path, VALIDATION_FILE_NAME)
-    if not os.path.exists(validation_path):
-        raise FileNotFoundError(f"Validation file {validation_path} does not exist.")
-    
-    df = pd.read_csv(validation_path)
+    df = load_validation_results(experiment_path, [
+        'experiment', 'domain', 'model', 'template', 'instance', 'sample_id',
+        'valid', 'num_action_landmarks', 'num_action_landmarks_used'
+    ])
     # Ensure 'valid' column is boolean
     df['valid'] = pd.to_numeric(df['valid'], errors='coerce').fillna(0).astype(bool)
 
@@ -236,7 +305,7 @@ def compute_metrics_by_attempt(experiment_path : str) -> pd.DataFrame:
     float_cols = grouped.select_dtypes(include=['float']).columns
     grouped[float_cols] = grouped[float_cols].round(2)
 
-    grouped.to_csv(os.path.join(experiment_path, "metrics_by_attempt.csv"), index=False)
+    grouped.to_csv(os.path.join(experiment_path, METRICS_BY_ATTEMPT_FILE_NAME), index=False)
 
     return grouped
 
@@ -4,7 +4,9 @@ from google.genai import types
 import dotenv
 import time
 import pandas as pd
+import asyncio
 from reasoning.task import Task
+from reasoning.ratelimit import get_rate_limiter, classify_error
 class Model:
     def __init__(self, name: str, **kwargs):
         self.name = name
@@ -13,6 +15,31 @@ class Model:
     def generate_response(self, prompt: str, **params) -> dict[str, str]:
         raise NotImplementedError("This method should be implemented by subclasses.")
 
+    async def generate_response_async(self, prompt: str, **params) -> dict[str, str]:
+        """
+        Async counterpart of generate_response; by default runs the blocking call in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate_response, prompt, **params)
+
+    def generate_batch(self, prompts: list[str], **params) -> list[dict[str, str] | Exception]:
+        """
+        Generates one response per prompt, in order. A prompt that fails yields the raised exception instead of a response.
+
+        Providers with native batching (batch endpoints, batched local inference) should override this;
+        the default multiplexes generate_response_async over the prompts, with at most the model's
+        max_in_flight (from model_config, default 1) requests running at any time.
+        """
+        async def _gather():
+            semaphore = asyncio.Semaphore(max(1, getattr(self, "max_in_flight", 1)))
+            async def _bounded(prompt):
+                async with semaphore:
+                    return await self.generate_response_async(prompt, **params)
+            return await asyncio.gather(*[_bounded(prompt) for prompt in prompts], return_exceptions=True)
+        return asyncio.run(_gather())
+
+    def get_stats(self) -> dict[str, float]:
+        return {}
+
 
 class GoogleModel(Model):
     def __init__(self, name : str, **kwargs):
@@ -25,53 +52,77 @@ class GoogleModel(Model):
             self.client = genai.Client(api_key=api_key)
         except Exception as e:
             raise RuntimeError(f"Failed to initialize Google GenAI client: {e}")
+        # Budgets are read from model_config and shared by every GoogleModel with the same name.
+        self.rate_limiter = get_rate_limiter(
+            self.name,
+            requests_per_minute=getattr(self, "requests_per_minute", None),
+            tokens_per_minute=getattr(self, "tokens_per_minute", None),
+        )
+
+    def get_stats(self) -> dict[str, float]:
+        return self.rate_limiter.stats.as_dict()
 
     def generate_response(self, prompt: str, wait_time: int = 0, **params) -> dict[str, str]:
+        """
+        Generates a response, retrying rate-limit (429), server (5xx) and unknown errors.
+
+        Every request goes through the model's shared rate limiter; wait_time is the base
+        delay (in seconds) of the jittered backoff between retries, so successful calls never sleep.
+        """
         generation_config = types.GenerateContentConfig(**params)
-        chances = 3
+        max_retries = getattr(self, "max_retries", 2)
+        estimated_tokens = len(prompt) // 4
         generated = False
+        error_class = "unknown"
         num_requests = 0
         metadata = {}
         text = ""
         thought = ""
-        while chances > 0 and not generated:
-            chances -= 1
+        for attempt in range(max_retries + 1):
+            if attempt > 0:
+                self.rate_limiter.backoff(attempt - 1, error_class, base_delay=wait_time)
+            self.rate_limiter.acquire(tokens=estimated_tokens)
+            num_requests += 1
             try:
-                num_requests += 1
                 response = self.client.models.generate_content(
                     model=self.name,
                     contents=prompt,
                     config=generation_config,
                 )
-                if  response and \
-                    response.candidates and \
-                    response.candidates[0] and \
-                    response.candidates[0].content and \
-                    response.candidates[0].content.parts:
-                        for part in response.candidates[0].content.parts:
-                            if not part.text:
-                                continue
-                            elif part.thought:
-                                thought = part.text
-                            else:
-                                text += part.text
-    
-                        metadata = {            
-                            "num_requests" : num_requests,
-                            "prompt_token_count" : response.usage_metadata.prompt_token_count,
-                            "candidates_token_count" : response.usage_metadata.candidates_token_count,
-                            "total_tokens_count" : response.usage_metadata.total_token_count,
-                        }
-                        if text: generated = True
-
             except Exception as e:
-                if wait_time == 0:
-                    wait_time = 1
-                # Exponential backoff
-                wait_time *= 2
-            finally:
-                if wait_time > 0:
-                    time.sleep(wait_time)
+                error_class = classify_error(e)
+                if error_class == "client":
+                    raise RuntimeError(f"Error generating response: {e}")
+                continue
+
+            if response and response.usage_metadata and response.usage_metadata.total_token_count:
+                self.rate_limiter.settle(estimated_tokens, response.usage_metadata.total_token_count)
+
+            text = ""
+            thought = ""
+            if  response and \
+                response.candidates and \
+                response.candidates[0] and \
+                response.candidates[0].content and \
+                response.candidates[0].content.parts:
+                    for part in response.candidates[0].content.parts:
+                        if not part.text:
+                            continue
+                        elif part.thought:
+                            thought = part.text
+                        else:
+                            text += part.text
+
+                    metadata = {            
+                        "num_requests" : num_requests,
+                        "prompt_token_count" : response.usage_metadata.prompt_token_count,
+                        "candidates_token_count" : response.usage_metadata.candidates_token_count,
+                        "total_tokens_count" : response.usage_metadata.total_token_count,
+                    }
+            if text:
+                generated = True
+                break
+            error_class = "unknown"
 
         if not generated:
             raise RuntimeError("Error generating response.")
@@ -0,0 +1,102 @@
+"""
+Orderings of action landmarks, either by their first appearance in a reference plan or from the
+natural orderings of the delete relaxation (the landmark graph).
+"""
+import heapq
+from typing import Iterable, Optional
+
+import numpy as np
+
+from reasoning.pddl import TOKEN_PATTERN, load_grounded_task
+from reasoning.relaxation import RelaxedTask
+from reasoning.task import Task
+
+def normalize_action(text: str) -> str:
+    """
+    Canonical form of a ground action, e.g. "0: ( Stack  A B )" -> "(stack a b)".
+    """
+    tokens = [token for token in TOKEN_PATTERN.findall(text.split(";", 1)[0].lower()) if token not in "()"]
+    if tokens and tokens[0].endswith(":"):
+        tokens = tokens[1:]
+    return f"({' '.join(tokens)})"
+
+def plan_positions(plan: Iterable[str]) -> dict[str, int]:
+    """
+    Position of the first appearance of every action of a plan, with actions compared token by token.
+    """
+    positions = {}
+    steps = (line for line in plan if line.split(";", 1)[0].strip())
+    for step, line in enumerate(steps):
+        positions.setdefault(normalize_action(line), step)
+    return positions
+
+def order_by_plan(landmarks: list[str], positions: dict[str, int]) -> list[str]:
+    """
+    Sorts landmarks by their first appearance in a plan (given by plan_positions).
+    """
+    def position(landmark: str) -> int:
+        key = normalize_action(landmark)
+        if key not in positions:
+            raise ValueError(f"Landmark {landmark} not found in solution.")
+        return positions[key]
+    return sorted(landmarks, key=position)
+
+def landmark_graph(relaxed_task: RelaxedTask, landmarks: list[int]) -> dict[int, set[int]]:
+    """
+    Natural orderings between action landmarks: a -> b if b is never applicable in the delete
+    relaxation without a, so the first occurrence of a precedes the first occurrence of b in every plan.
+    """
+    targets = np.array(landmarks, dtype=np.int64)
+    graph = {}
+    for landmark in landmarks:
+        _, layer = relaxed_task.reachable(np.array([landmark], dtype=np.int64))
+        graph[landmark] = {int(op) for op in targets[layer[targets] == -1] if op != landmark}
+    return graph
+
+def order_by_graph(relaxed_task: RelaxedTask, landmarks: list[int]) -> list[int]:
+    """
+    Topological order of the landmark graph; landmarks free to go first are taken by increasing hadd
+    cost, then by name. Raises a RuntimeError if the graph has a cycle.
+    """
+    graph = landmark_graph(relaxed_task, landmarks)
+    _, op_cost, _ = relaxed_task.costs("hadd")
+    names = relaxed_task.task.operators
+    predecessors = {landmark: 0 for landmark in landmarks}
+    for successors in graph.values():
+        for successor in successors:
+            predecessors[successor] += 1
+    heap = [(op_cost[landmark], names[landmark], landmark) for landmark, count in predecessors.items() if count == 0]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        _, _, landmark = heapq.heappop(heap)
+        order.append(landmark)
+        for successor in graph[landmark]:
+            predecessors[successor] -= 1
+            if predecessors[successor] == 0:
+                heapq.heappush(heap, (op_cost[successor], names[successor], successor))
+    if len(order) != len(landmarks):
+        cycle = sorted(names[landmark] for landmark, count in predecessors.items() if count > 0)
+        raise RuntimeError(f"Landmark graph has a cycle through {cycle}.")
+    return order
+
+def order_landmarks(task: Task, landmarks: list[str], plan: Optional[list[str]] = None) -> list[str]:
+    """
+    Orders the action landmarks of a task by their first appearance in plan (default: the task's
+    stored plan, if present and fresh) or, without a reference plan, by the landmark graph.
+    """
+    if plan is None:
+        from reasoning.planner import ARTIFACT_STORE
+        # Only a plan already in the store is used; searching for one is left to the planner
+        plan = ARTIFACT_STORE.get(task, "plan", compute=False)
+    if plan is not None:
+        return order_by_plan(landmarks, plan_positions(plan))
+
+    grounded_task = load_grounded_task(task.domain.path, task.instance.path)
+    operator_index = {name: i for i, name in enumerate(grounded_task.operators)}
+    missing = [landmark for landmark in landmarks if normalize_action(landmark) not in operator_index]
+    if missing:
+        raise ValueError(f"Landmarks {missing} are not operators of task {task}.")
+    ops = [operator_index[normalize_action(landmark)] for landmark in landmarks]
+    by_op = dict(zip(ops, landmarks))
+    return [by_op[op] for op in order_by_graph(RelaxedTask(grounded_task), ops)]
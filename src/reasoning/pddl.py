@@ -0,0 +1,408 @@
+"""
+Minimal PDDL front end for the STRIPS (+ typing, negative preconditions, equality) fragment
+used by the benchmarks, and a plan simulator over bitset states.
+"""
+import re
+import threading
+from functools import lru_cache
+from typing import Optional
+
+TOKEN_PATTERN = re.compile(r"\(|\)|[^\s()]+")
+PLAN_STEP_PATTERN = re.compile(r"^(?:\d+(?:\.\d+)?\s*:\s*)?(\(.*\))(?:\s*\[[\d.]+\])?$")
+
+def parse_sexpr(text: str) -> list:
+    """
+    Parses PDDL text into nested lists of lowercase tokens, dropping comments.
+    """
+    text = re.sub(r";[^\n]*", "", text).lower()
+    stack = [[]]
+    for token in TOKEN_PATTERN.findall(text):
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if len(stack) == 1:
+                raise ValueError("Unbalanced parentheses in PDDL.")
+            expr = stack.pop()
+            stack[-1].append(expr)
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1 or not stack[0]:
+        raise ValueError("Unbalanced parentheses in PDDL.")
+    return stack[0][0]
+
+def parse_typed_list(items: list) -> list[tuple[str, str]]:
+    """
+    Parses "a b - t1 c - t2 d" into [(a, t1), (b, t1), (c, t2), (d, object)].
+    """
+    result, pending = [], []
+    i = 0
+    while i < len(items):
+        if items[i] == "-":
+            if i + 1 >= len(items):
+                raise ValueError("Missing type in typed list.")
+            # (either t1 t2) is approximated by its first type
+            type_name = items[i + 1][1] if isinstance(items[i + 1], list) else items[i + 1]
+            result.extend((name, type_name) for name in pending)
+            pending = []
+            i += 2
+        else:
+            pending.append(items[i])
+            i += 1
+    result.extend((name, "object") for name in pending)
+    return result
+
+def parse_condition(expr: list) -> list[tuple[bool, str, tuple[str, ...]]]:
+    """
+    Parses a conjunction of (possibly negated) atoms into (positive, predicate, args) literals.
+    """
+    if not expr:
+        return []
+    if expr[0] == "and":
+        literals = []
+        for sub_expr in expr[1:]:
+            literals.extend(parse_condition(sub_expr))
+        return literals
+    if expr[0] == "not":
+        if len(expr) != 2 or not isinstance(expr[1], list) or (expr[1] and expr[1][0] in ("and", "or", "not")):
+            raise ValueError(f"Unsupported negated condition: {expr}")
+        ((_, predicate, args),) = parse_condition(expr[1])
+        return [(False, predicate, args)]
+    if expr[0] in ("or", "imply", "forall", "exists", "when", "increase", "decrease"):
+        raise ValueError(f"Unsupported PDDL construct: {expr[0]}")
+    if any(isinstance(arg, list) for arg in expr[1:]):
+        raise ValueError(f"Unsupported PDDL expression: {expr}")
+    return [(True, expr[0], tuple(expr[1:]))]
+
+
+class Action:
+    def __init__(self, name: str, parameters: list[tuple[str, str]], precondition: list, effect: list):
+        self.name : str = name
+        self.parameters : list[tuple[str, str]] = parameters
+        self.precondition : list[tuple[bool, str, tuple[str, ...]]] = precondition
+        self.add_effects : list[tuple[str, tuple[str, ...]]] = [(p, args) for positive, p, args in effect if positive]
+        self.del_effects : list[tuple[str, tuple[str, ...]]] = [(p, args) for positive, p, args in effect if not positive]
+
+
+class PDDLDomain:
+    def __init__(self, text: str):
+        expr = parse_sexpr(text)
+        if expr[:1] != ["define"]:
+            raise ValueError("Domain file must start with define.")
+        self.name : str = ""
+        self.types : dict[str, str] = {}
+        self.constants : dict[str, str] = {}
+        self.predicates : set[str] = set()
+        self.actions : dict[str, Action] = {}
+        for section in expr[1:]:
+            key = section[0]
+            if key == "domain":
+                self.name = section[1]
+            elif key == ":types":
+                self.types.update(parse_typed_list(section[1:]))
+            elif key == ":constants":
+                self.constants.update(parse_typed_list(section[1:]))
+            elif key == ":predicates":
+                self.predicates.update(predicate[0] for predicate in section[1:])
+            elif key == ":action":
+                self.actions[section[1]] = self._parse_action(section)
+            elif key in (":requirements",):
+                continue
+            else:
+                raise ValueError(f"Unsupported domain section: {key}")
+
+    def _parse_action(self, section: list) -> Action:
+        fields = {section[i]: section[i + 1] for i in range(2, len(section) - 1, 2)}
+        return Action(
+            name=section[1],
+            parameters=parse_typed_list(fields.get(":parameters", [])),
+            precondition=parse_condition(fields.get(":precondition", [])),
+            effect=parse_condition(fields.get(":effect", [])),
+        )
+
+    def is_subtype(self, type_name: str, parent: str) -> bool:
+        seen = set()
+        while type_name not in seen:
+            if type_name == parent or parent == "object":
+                return True
+            seen.add(type_name)
+            type_name = self.types.get(type_name, "object")
+        return False
+
+
+class PDDLProblem:
+    def __init__(self, text: str):
+        expr = parse_sexpr(text)
+        if expr[:1] != ["define"]:
+            raise ValueError("Problem file must start with define.")
+        self.name : str = ""
+        self.objects : dict[str, str] = {}
+        self.init : set[tuple[str, ...]] = set()
+        self.goal : list[tuple[bool, str, tuple[str, ...]]] = []
+        for section in expr[1:]:
+            key = section[0]
+            if key == "problem":
+                self.name = section[1]
+            elif key == ":objects":
+                self.objects.update(parse_typed_list(section[1:]))
+            elif key == ":init":
+                for atom in section[1:]:
+                    if atom[0] in ("=", "not"):
+                        raise ValueError(f"Unsupported initial state atom: {atom}")
+                    self.init.add(tuple(atom))
+            elif key == ":goal":
+                self.goal = parse_condition(section[1])
+            elif key in (":domain", ":requirements"):
+                continue
+            else:
+                raise ValueError(f"Unsupported problem section: {key}")
+
+
+class Simulator:
+    """
+    Executes plans of a (domain, problem) pair over states encoded as integer bitsets.
+
+    Fact bits are assigned lazily, so only the facts a plan touches are ever indexed.
+    """
+    def __init__(self, domain: PDDLDomain, problem: PDDLProblem):
+        self.domain : PDDLDomain = domain
+        self.problem : PDDLProblem = problem
+        self.objects : dict[str, str] = {**domain.constants, **problem.objects}
+        self.facts : dict[tuple[str, ...], int] = {}
+        self.lock = threading.Lock()
+        self.initial_state : int = self.mask(problem.init)
+        self.goal_pos : int = self.mask((p, *args) for positive, p, args in problem.goal if positive and p != "=")
+        self.goal_neg : int = self.mask((p, *args) for positive, p, args in problem.goal if not positive and p != "=")
+
+    def bit(self, fact: tuple[str, ...]) -> int:
+        index = self.facts.get(fact)
+        if index is None:
+            # Simulators are shared between validation threads
+            with self.lock:
+                index = self.facts.setdefault(fact, len(self.facts))
+        return 1 << index
+
+    def mask(self, facts) -> int:
+        result = 0
+        for fact in facts:
+            result |= self.bit(fact)
+        return result
+
+    def simulate(self, plan: list[str]) -> tuple[bool, Optional[str], list[str]]:
+        """
+        Executes plan from the initial state.
+
+        Returns (valid, error, report) with error categories matching reasoning.utils.val. Like VAL,
+        operator names are resolved for the whole plan before anything is executed, so an unknown
+        operator anywhere in the plan is reported even if an earlier step fails to execute; arity,
+        objects and types are checked when a step is reached.
+        """
+        state = self.initial_state
+        report = []
+        # Like VAL, ignore comments and any line that is not a parenthesized step
+        plan = [line.split(";", 1)[0].strip() for line in plan]
+        steps = [match.group(1) for match in map(PLAN_STEP_PATTERN.match, plan) if match]
+        exprs = []
+        for step, line in enumerate(steps, start=1):
+            try:
+                expr = parse_sexpr(line)
+            except ValueError:
+                expr = []
+            if not expr or any(isinstance(token, list) for token in expr):
+                # Unparsable steps are only reported once execution reaches them, like in VAL's report
+                exprs.append(None)
+                continue
+            if expr[0] not in self.domain.actions:
+                report.append(f"Bad operator in plan! Step {step}: {line}")
+                return False, "Error: Bad operator in plan.", report
+            exprs.append(expr)
+
+        for step, (line, expr) in enumerate(zip(steps, exprs), start=1):
+            if expr is None:
+                report.append(f"Bad plan description! Step {step}: {line}")
+                return False, "Error: Bad plan description.", report
+            name, args = expr[0], tuple(expr[1:])
+            action = self.domain.actions[name]
+            if len(args) != len(action.parameters) or any(arg not in self.objects for arg in args):
+                report.append(f"Bad operator in plan! Step {step}: {line}")
+                return False, "Error: Bad operator in plan.", report
+            if any(not self.domain.is_subtype(self.objects[arg], type_name) for arg, (_, type_name) in zip(args, action.parameters)):
+                report.append(f"Error in type-checking! Step {step}: {line}")
+                return False, "Error: Error in type-checking.", report
+            binding = {var: arg for (var, _), arg in zip(action.parameters, args)}
+
+            for positive, predicate, pre_args in action.precondition:
+                ground_args = tuple(binding.get(arg, arg) for arg in pre_args)
+                if predicate == "=":
+                    holds = ground_args[0] == ground_args[1]
+                else:
+                    holds = bool(state & self.bit((predicate, *ground_args)))
+                if holds != positive:
+                    report.append(f"Plan failed to execute. Step {step}: {line} has an unsatisfied precondition")
+                    return False, "Error: Plan failed to execute.", report
+
+            delete = self.mask((p, *(binding.get(a, a) for a in p_args)) for p, p_args in action.del_effects)
+            add = self.mask((p, *(binding.get(a, a) for a in p_args)) for p, p_args in action.add_effects)
+            state = (state & ~delete) | add
+            report.append(f"Step {step}: {line}")
+
+        report.append("Plan executed successfully - checking goal")
+        goal_equalities = all(
+            (args[0] == args[1]) == positive for positive, p, args in self.problem.goal if p == "="
+        )
+        if state & self.goal_pos != self.goal_pos or state & self.goal_neg or not goal_equalities:
+            report.append("Goal not satisfied")
+            return False, "Error: Goal not satisfied.", report
+        report.append("Plan valid")
+        return True, None, report
+
+
+@lru_cache(maxsize=64)
+def load_simulator(domain_path: str, instance_path: str) -> Simulator:
+    """
+    Parses a domain/instance pair once per process.
+    """
+    with open(domain_path, 'r') as f:
+        domain = PDDLDomain(f.read())
+    with open(instance_path, 'r') as f:
+        problem = PDDLProblem(f.read())
+    return Simulator(domain, problem)
+
+def simulate(domain_path: str, instance_path: str, plan: list[str], save_path: Optional[str] = None) -> tuple[bool, Optional[str]]:
+    """
+    In-process counterpart of reasoning.utils.val; raises ValueError if the domain uses unsupported PDDL.
+    """
+    valid, error, report = load_simulator(domain_path, instance_path).simulate(plan)
+    if save_path:
+        with open(save_path, 'w') as f:
+            f.write("\n".join(report) + "\n")
+    return valid, error
+
+
+class GroundedTask:
+    """
+    Delete-relaxed grounding of a (domain, problem) pair with integer-indexed facts and operators.
+
+    Only operators reachable in the delete relaxation are instantiated. Negative preconditions
+    and delete effects are dropped; operator names follow pyperplan, e.g. "(stack b1 b2)".
+    """
+    def __init__(self, facts: list[tuple[str, ...]], operators: list[str], preconditions: list[list[int]],
+                 add_effects: list[list[int]], initial_state: list[int], goals: list[int]):
+        self.facts : list[tuple[str, ...]] = facts
+        self.operators : list[str] = operators
+        self.preconditions : list[list[int]] = preconditions
+        self.add_effects : list[list[int]] = add_effects
+        self.initial_state : list[int] = initial_state
+        self.goals : list[int] = goals
+
+
+def _bindings(action: Action, objects: dict[str, str], domain: PDDLDomain, index: dict, reached: dict[str, set]):
+    """
+    Yields every parameter binding of action whose positive preconditions are all reached.
+    """
+    variables = [var for var, _ in action.parameters]
+    types = dict(action.parameters)
+    atoms = [(p, args) for positive, p, args in action.precondition if positive and p != "="]
+    # Join the atoms with the fewest reached facts first
+    atoms.sort(key=lambda atom: len(reached.get(atom[0], ())))
+    equalities = [(positive, args) for positive, p, args in action.precondition if p == "="]
+    candidates = {
+        var: [obj for obj, type_name in objects.items() if domain.is_subtype(type_name, types[var])]
+        for var in variables
+    }
+
+    def lookup(predicate: str, positions: tuple[int, ...], values: tuple[str, ...]) -> list[tuple[str, ...]]:
+        key = (predicate, positions)
+        if key not in index:
+            table = {}
+            for fact in reached.get(predicate, ()):
+                table.setdefault(tuple(fact[i] for i in positions), []).append(fact)
+            index[key] = table
+        return index[key].get(values, [])
+
+    def join(i: int, binding: dict[str, str]):
+        if i == len(atoms):
+            free = [var for var in variables if var not in binding]
+            yield from assign(free, binding)
+            return
+        predicate, args = atoms[i]
+        positions = tuple(j for j, arg in enumerate(args) if not arg.startswith("?") or arg in binding)
+        values = tuple(binding.get(args[j], args[j]) for j in positions)
+        for fact in lookup(predicate, positions, values):
+            extended = dict(binding)
+            consistent = True
+            for arg, value in zip(args, fact):
+                if arg.startswith("?"):
+                    if extended.setdefault(arg, value) != value or value not in objects:
+                        consistent = False
+                        break
+            if consistent:
+                yield from join(i + 1, extended)
+
+    def assign(free: list[str], binding: dict[str, str]):
+        if not free:
+            if all(domain.is_subtype(objects[binding[var]], types[var]) for var in variables) and all(
+                (binding.get(a, a) == binding.get(b, b)) == positive for positive, (a, b) in equalities
+            ):
+                yield binding
+            return
+        for obj in candidates[free[0]]:
+            yield from assign(free[1:], {**binding, free[0]: obj})
+
+    yield from join(0, {})
+
+def ground(domain: PDDLDomain, problem: PDDLProblem) -> GroundedTask:
+    """
+    Grounds the operators reachable from the initial state in the delete relaxation.
+    """
+    objects = {**domain.constants, **problem.objects}
+    reached : dict[str, set[tuple[str, ...]]] = {}
+    for fact in problem.init:
+        reached.setdefault(fact[0], set()).add(fact[1:])
+    operators : dict[str, tuple[list[tuple[str, ...]], list[tuple[str, ...]]]] = {}
+    changed = True
+    while changed:
+        changed = False
+        index = {}
+        new_facts = []
+        for action in domain.actions.values():
+            for binding in _bindings(action, objects, domain, index, reached):
+                args = [binding[var] for var, _ in action.parameters]
+                name = f"({' '.join([action.name, *args])})"
+                if name in operators:
+                    continue
+                ground_atom = lambda p, p_args: (p, *(binding.get(a, a) for a in p_args))
+                preconditions = [ground_atom(p, p_args) for positive, p, p_args in action.precondition if positive and p != "="]
+                add_effects = [ground_atom(p, p_args) for p, p_args in action.add_effects]
+                operators[name] = (preconditions, add_effects)
+                new_facts.extend(add_effects)
+        for fact in new_facts:
+            if fact[1:] not in reached.setdefault(fact[0], set()):
+                reached[fact[0]].add(fact[1:])
+                changed = True
+
+    facts = sorted((predicate, *args) for predicate, tuples in reached.items() for args in tuples)
+    fact_index = {fact: i for i, fact in enumerate(facts)}
+    names = sorted(operators)
+    goals = []
+    for positive, p, args in problem.goal:
+        if positive and p != "=":
+            # An unreachable goal fact gets an index no operator adds
+            goals.append(fact_index.setdefault((p, *args), len(fact_index)))
+    if len(fact_index) > len(facts):
+        facts = sorted(fact_index, key=fact_index.get)
+    return GroundedTask(
+        facts=facts,
+        operators=names,
+        preconditions=[[fact_index[fact] for fact in operators[name][0]] for name in names],
+        add_effects=[[fact_index[fact] for fact in operators[name][1]] for name in names],
+        initial_state=sorted(fact_index[fact] for fact in problem.init),
+        goals=goals,
+    )
+
+@lru_cache(maxsize=16)
+def load_grounded_task(domain_path: str, instance_path: str) -> GroundedTask:
+    with open(domain_path, 'r') as f:
+        domain = PDDLDomain(f.read())
+    with open(instance_path, 'r') as f:
+        problem = PDDLProblem(f.read())
+    return ground(domain, problem)
@@ -0,0 +1,291 @@
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from importlib import metadata
+
+from reasoning.settings import ARTIFACTS_MANIFEST_FILE_NAME, PLANNER_BACKEND
+from reasoning.task import Task, get_tasks
+from reasoning.utils import extract
+
+# Planner artifacts: object type -> (solution file extension, pyperplan arguments)
+PYPERPLAN_ARTIFACTS : dict[str, tuple[str, list[str]]] = {
+    "landmark": (".pddl.lndmk", ["-s", "astar", "-H", "actionlandmark"]),
+    "delete_relaxed_plan": (".pddl.soln.rlx", ["-s", "gbf", "-H", "hffpo"]),
+    "plan": (".pddl.soln", ["-s", "gbf", "-H", "hff"]),
+}
+
+# Artifacts the "native" backend computes itself (reasoning.relaxation); bump the version when their output changes
+NATIVE_ARTIFACTS : set[str] = {"landmark", "delete_relaxed_plan"}
+NATIVE_VERSION = "1"
+
+@lru_cache(maxsize=None)
+def get_planner_version() -> str:
+    try:
+        return metadata.version("pyperplan")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+def is_native(obj: str, backend: str | None = None) -> bool:
+    return (backend or PLANNER_BACKEND) == "native" and obj in NATIVE_ARTIFACTS
+
+def get_artifact_key(obj: str, backend: str | None = None) -> str:
+    """
+    Cache key of an artifact type: changes whenever the producer (native or pyperplan), its version or its command changes.
+    """
+    if is_native(obj, backend):
+        payload = json.dumps(["native", NATIVE_VERSION, obj])
+    else:
+        _, args = PYPERPLAN_ARTIFACTS[obj]
+        payload = json.dumps(["pyperplan", get_planner_version(), *args])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def run_pyperplan(task: Task, obj: str) -> str:
+    """
+    Runs the pyperplan CLI for a task and returns the content to be stored in the artifact file.
+
+    pyperplan writes the plan it finds next to the instance file, so it runs on a copy of the
+    instance in a temporary directory and never touches the benchmark's own files.
+    """
+    if obj not in PYPERPLAN_ARTIFACTS:
+        raise ValueError(f"Unknown object type: {obj}")
+    _, args = PYPERPLAN_ARTIFACTS[obj]
+    with tempfile.TemporaryDirectory(prefix="reasoning-pyperplan-") as temp_dir:
+        instance_path = os.path.join(temp_dir, os.path.basename(task.instance.path))
+        shutil.copyfile(task.instance.path, instance_path)
+        command = ["pyperplan", *args, task.domain.path, instance_path]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Error running pyperplan for task {task}: {result.stderr}")
+        if obj != "plan":
+            return result.stdout
+        planner_soln_path = instance_path + ".soln"
+        if not os.path.exists(planner_soln_path):
+            raise RuntimeError(f"Pyperplan found no plan for task {task}.")
+        with open(planner_soln_path, 'r') as f:
+            return f.read()
+
+# pyperplan's search and heuristics are not reentrant and report through stdout
+_inprocess_lock = threading.Lock()
+# Single worker process that runs pyperplan for threads of the main process, so capturing its
+# stdout never swallows what other threads print
+_planner_pool : ProcessPoolExecutor | None = None
+_planner_pool_lock = threading.Lock()
+
+@lru_cache(maxsize=8)
+def ground_pyperplan_task(domain_path: str, instance_path: str):
+    """
+    Parses and grounds a task with pyperplan once; the grounded task is shared by all artifact types.
+    """
+    from pyperplan.planner import _parse, _ground
+    return _ground(_parse(domain_path, instance_path))
+
+def run_pyperplan_inprocess(task: Task, obj: str) -> list[str]:
+    """
+    Runs pyperplan inside this interpreter and returns the artifact items (landmarks or plan actions).
+
+    Raises KeyError if the installed pyperplan lacks the heuristic that reports the artifact (e.g.
+    stock pyperplan has no "actionlandmark"). Captures the process-wide stdout, so it must only run
+    in a process whose other threads do not print (see run_pyperplan_isolated).
+    """
+    from pyperplan.planner import HEURISTICS, SEARCHES, _search
+    if obj not in PYPERPLAN_ARTIFACTS:
+        raise ValueError(f"Unknown object type: {obj}")
+    _, args = PYPERPLAN_ARTIFACTS[obj]
+    search_name, heuristic_name = args[1], args[3]
+    use_preferred_ops = heuristic_name == "hffpo"
+    if heuristic_name not in HEURISTICS:
+        # Like the CLI, "hffpo" is hff with preferred operators, but only a pyperplan defining it reports the relaxed plan
+        if obj != "plan" or not use_preferred_ops:
+            raise KeyError(f"Pyperplan has no {heuristic_name} heuristic to compute {obj}.")
+        heuristic_name = "hff"
+    grounded_task = ground_pyperplan_task(task.domain.path, task.instance.path)
+    output = io.StringIO()
+    with _inprocess_lock, contextlib.redirect_stdout(output):
+        heuristic = HEURISTICS[heuristic_name](grounded_task)
+        solution = _search(grounded_task, SEARCHES[search_name], heuristic, use_preferred_ops)
+    if obj == "plan":
+        if solution is None:
+            raise RuntimeError(f"Pyperplan found no plan for task {task}.")
+        return [op.name for op in solution]
+    # The action landmarks and the delete-relaxed plan are reported by the heuristic itself
+    return extract(output.getvalue(), obj)
+
+def run_pyperplan_isolated(task: Task, obj: str) -> list[str]:
+    """
+    Runs run_pyperplan_inprocess in the planner worker process.
+    """
+    global _planner_pool
+    with _planner_pool_lock:
+        if _planner_pool is None:
+            _planner_pool = ProcessPoolExecutor(max_workers=1)
+    return _planner_pool.submit(run_pyperplan_inprocess, task, obj).result()
+
+def format_artifact(items: list[str], obj: str) -> str:
+    """
+    Formats artifact items the way the pyperplan CLI reports them, so both backends share the artifact files.
+    """
+    if obj == "landmark":
+        return "<action-landmarks-set>\n" + "".join(f"{item}\n" for item in items) + "</action-landmarks-set>\n"
+    if obj == "delete_relaxed_plan":
+        return "<delete-relaxed-plan>\n" + "".join(f"{item}\n" for item in items) + "</delete-relaxed-plan>\n"
+    return "\n".join(items)
+
+def run_native(task: Task, obj: str) -> list[str]:
+    """
+    Computes an artifact with the delete-relaxation analyses of reasoning.relaxation.
+    """
+    from reasoning.relaxation import compute_action_landmarks, compute_delete_relaxed_plan
+    if obj == "landmark":
+        return compute_action_landmarks(task.domain.path, task.instance.path)
+    if obj == "delete_relaxed_plan":
+        plan = compute_delete_relaxed_plan(task.domain.path, task.instance.path)
+        if plan is None:
+            raise RuntimeError(f"No delete-relaxed plan exists for task {task}.")
+        return plan
+    raise ValueError(f"Object type not supported natively: {obj}")
+
+def compute_artifact(task: Task, obj: str, backend: str | None = None, isolate: bool = True) -> str:
+    """
+    Computes an artifact with the configured backend ("native", "inprocess" or "subprocess") and returns the artifact file content.
+
+    The native backend delegates the artifacts it does not support to pyperplan in-process, and the
+    in-process backend falls back to the CLI when pyperplan cannot be imported, lacks the heuristic
+    or does not report the artifact. With isolate, in-process pyperplan runs in a worker process;
+    callers that already are single-threaded workers pass isolate=False.
+    """
+    backend = backend or PLANNER_BACKEND
+    if is_native(obj, backend):
+        return format_artifact(run_native(task, obj), obj)
+    if backend in ("native", "inprocess"):
+        run = run_pyperplan_isolated if isolate else run_pyperplan_inprocess
+        try:
+            return format_artifact(run(task, obj), obj)
+        except (ImportError, KeyError, ValueError):
+            pass
+    elif backend != "subprocess":
+        raise ValueError(f"Unknown planner backend: {backend}")
+    return run_pyperplan(task, obj)
+
+def parse_artifact(content: str, obj: str) -> list[str]:
+    if obj == "plan":
+        return [line.strip() for line in content.splitlines() if line.strip()]
+    return extract(content, obj)
+
+
+class ArtifactStore:
+    """
+    Planner artifacts (landmarks, delete-relaxed plans and plans) stored in each domain's solutions directory.
+
+    A manifest next to the artifacts records the planner version and command each file was produced
+    with; files produced by a different planner are recomputed, files without a manifest entry are
+    trusted as-is. Parsed artifacts are kept in an in-memory index after the first lookup.
+    """
+    def __init__(self):
+        self.index : dict[tuple[Task, str], list[str]] = {}
+        self.manifests : dict[str, dict[str, dict[str, str]]] = {}
+        self.lock = threading.Lock()
+
+    def _manifest(self, solutions_dir: str) -> dict[str, dict[str, str]]:
+        if solutions_dir not in self.manifests:
+            path = os.path.join(solutions_dir, ARTIFACTS_MANIFEST_FILE_NAME)
+            manifest = {}
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    manifest = json.load(f)
+            self.manifests[solutions_dir] = manifest
+        return self.manifests[solutions_dir]
+
+    def _save_manifest(self, solutions_dir: str) -> None:
+        path = os.path.join(solutions_dir, ARTIFACTS_MANIFEST_FILE_NAME)
+        with open(path, 'w') as f:
+            json.dump(self._manifest(solutions_dir), f, indent=2, sort_keys=True)
+
+    def is_fresh(self, task: Task, obj: str) -> bool:
+        extension, _ = PYPERPLAN_ARTIFACTS[obj]
+        path = task.get_solution_path(extension)
+        if not os.path.exists(path):
+            return False
+        with self.lock:
+            entry = self._manifest(os.path.dirname(path)).get(os.path.basename(path))
+        return entry is None or entry["key"] == get_artifact_key(obj)
+
+    def _write(self, task: Task, obj: str, content: str) -> None:
+        extension, args = PYPERPLAN_ARTIFACTS[obj]
+        path = task.get_solution_path(extension)
+        with open(path, 'w') as f:
+            f.write(content)
+        solutions_dir = os.path.dirname(path)
+        with self.lock:
+            self._manifest(solutions_dir)[os.path.basename(path)] = {
+                "key": get_artifact_key(obj),
+                "version": NATIVE_VERSION if is_native(obj) else get_planner_version(),
+                "command": f"native {obj}" if is_native(obj) else " ".join(["pyperplan", *args]),
+            }
+            self._save_manifest(solutions_dir)
+
+    def get(self, task: Task, obj: str, compute: bool = True) -> list[str] | None:
+        """
+        Items of an artifact, computed if missing or stale; without compute, None is returned instead.
+        """
+        if obj not in PYPERPLAN_ARTIFACTS:
+            raise ValueError(f"Unknown object type: {obj}")
+        items = self.index.get((task, obj))
+        if items is None:
+            extension, _ = PYPERPLAN_ARTIFACTS[obj]
+            if self.is_fresh(task, obj):
+                with open(task.get_solution_path(extension), 'r') as f:
+                    content = f.read()
+            elif compute:
+                content = compute_artifact(task, obj)
+                self._write(task, obj, content)
+            else:
+                return None
+            items = parse_artifact(content, obj)
+            self.index[(task, obj)] = items
+        # Callers may reorder the items (e.g. shuffle landmarks), so never hand out the cached list
+        return list(items)
+
+    def precompute(self, tasks: list[Task], objs: list[str] | None = None, max_workers: int | None = None) -> None:
+        """
+        Computes every missing or stale artifact of tasks in parallel, bounded by max_workers processes
+        (default: one per core), and loads all artifacts into the in-memory index.
+        """
+        objs = objs or list(PYPERPLAN_ARTIFACTS)
+        missing = [(task, obj) for task in tasks for obj in objs if not self.is_fresh(task, obj)]
+        if missing:
+            with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+                futures = {executor.submit(compute_artifact, task, obj, None, False): (task, obj) for task, obj in missing}
+                for future in as_completed(futures):
+                    task, obj = futures[future]
+                    try:
+                        self._write(task, obj, future.result())
+                    except Exception as e:
+                        print(f"Error computing {obj} for task {task}: {e}")
+        for task in tasks:
+            for obj in objs:
+                if self.is_fresh(task, obj):
+                    self.get(task, obj)
+
+
+ARTIFACT_STORE = ArtifactStore()
+
+def from_pyperplan(task: Task, obj: str) -> list[str]:
+    """
+    Get a specific object from the pyperplan output for a task.
+    """
+    return ARTIFACT_STORE.get(task, obj)
+
+if __name__ == "__main__":
+    domains = ["blocksworld", "logistics", "miconic", "spanner", "minigrid"]
+    for domain in domains:
+        tasks = sorted(get_tasks(domain))
+        print(f"Precomputing planner artifacts for {len(tasks)} tasks of domain '{domain}'...")
+        ARTIFACT_STORE.precompute(tasks)
@@ -2,7 +2,9 @@ from __future__ import annotations
 from reasoning.task import Domain, Instance, Task
 from reasoning.utils import from_pyperplan, sort_landmarks
 from string import Template
+import copy
 import random
+import threading
 
 storage_domain : Domain = Domain(name="storage", path="data/examples/storage/domain.pddl")
 storage_instance : Instance = Instance(name="p01", path="data/examples/storage/instances/p01.pddl")
@@ -21,21 +23,53 @@ class PromptBuilder:
         self.metadata : dict[Task, dict[any, any]] = {}
         self.data : dict[Task, dict[any, any]] = {}
         self.template_kwargs = template_kwargs
+        # Rendered task-independent segments (description per domain, examples, checklist)
+        self.segments : dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def with_template_kwargs(self, template_kwargs: dict[str, any]) -> PromptBuilder:
+        """
+        Returns a new builder configured like this one, with its own template kwargs and caches.
+        """
+        builder = copy.copy(self)
+        builder.template_kwargs = dict(template_kwargs)
+        builder.metadata, builder.data, builder.segments = {}, {}, {}
+        builder.lock = threading.Lock()
+        return builder
 
     def build(self, task: Task) -> str:
         self.process_task(task, is_example=False)
-        for ex in self.examples:
-            self.process_task(ex, is_example=True)
-        examples_str = '\n\n'.join(
-            [self.example_template.substitute(self.data[ex]) for ex in self.examples]
-        )
-        return f"""{self.description_template.substitute(**self.data[task])}
+        data = self.data[task]
+        return f"""{self.render_description(data)}
 
-{self.problem_template.substitute(**self.data[task])}
+{self.problem_template.substitute(**data)}
 
-{examples_str}
+{self.render_examples()}
 
-{self.checklist}"""
+{self.render_checklist()}"""
+
+    def _segment(self, key: str, render) -> str:
+        segment = self.segments.get(key)
+        if segment is None:
+            segment = render()
+            with self.lock:
+                segment = self.segments.setdefault(key, segment)
+        return segment
+
+    def render_description(self, data: dict[str, str]) -> str:
+        return self._segment(f"description:{data['name']}", lambda: self.description_template.substitute(**data))
+
+    def render_examples(self) -> str:
+        def render():
+            for ex in self.examples:
+                self.process_task(ex, is_example=True)
+            return '\n\n'.join(
+                [self.example_template.substitute(self.data[ex]) for ex in self.examples]
+            )
+        return self._segment("examples", render)
+
+    def render_checklist(self) -> str:
+        return self._segment("checklist", lambda: self.checklist)
 
     def get_metadata(self, task):
         return self.metadata.get(task, {})
@@ -48,22 +82,36 @@ class PromptBuilder:
         return template
 
     def process_task(self, task: Task, is_example: bool) -> None:
-        if not task in self.data:
-            data = {
-                "name": task.domain.name,
-                "domain": task.domain.read(),
-                "instance": task.instance.read()
-            }
-            if is_example:
-                plan : list[str] = from_pyperplan(task, "plan")
-                if not plan:
-                    raise RuntimeError(f"Failed to get plan for example task {task}")
-                data["plan"] = "\n".join(plan)
-            self.data[task] = data
-        if task not in self.metadata:
-            self.metadata[task] = {
-                "template" : self.get_template(),
-            }
+        if task in self.data:
+            return
+        # Prepared outside the lock so tasks are processed concurrently, then published whole
+        data, metadata = self.prepare_task(task, is_example)
+        with self.lock:
+            self.metadata.setdefault(task, metadata)
+            self.data.setdefault(task, data)
+
+    def prepare_task(self, task: Task, is_example: bool) -> tuple[dict[str, str], dict[any, any]]:
+        data = {
+            "name": task.domain.name,
+            "domain": task.domain.read(),
+            "instance": task.instance.read()
+        }
+        if is_example:
+            plan : list[str] = from_pyperplan(task, "plan")
+            if not plan:
+                raise RuntimeError(f"Failed to get plan for example task {task}")
+            data["plan"] = "\n".join(plan)
+        metadata = {
+            "template" : self.get_template(),
+        }
+        return data, metadata
+
+    @property
+    def artifacts(self) -> list[str]:
+        """
+        Planner artifacts prepare_task reads for a task that is not an example.
+        """
+        return []
 
     @property
     def description_template(self) -> Template:
@@ -266,21 +314,24 @@ This is a plan for the $name instance above:
 $plan
 </plan-$name-example>""")
     
-    def process_task(self, task: Task, is_example: bool) -> None:
-        if not task in self.data:
-            super().process_task(task, is_example)
-            landmarks = from_pyperplan(task, "landmark")
-            if self.ordered:
-                try:
-                    landmarks = sort_landmarks(task, landmarks)
-                except RuntimeError as e:
-                    raise RuntimeError(f"Failed to sort action landmarks: {e}")            
-            else:
-                random.seed(42)
-                random.shuffle(landmarks)
-            self.data[task]["action_landmarks"] = "\n".join(landmarks) if len(landmarks) > 0 else ""
-            self.metadata[task]["action_landmarks"] = self.data[task]["action_landmarks"]
-            self.metadata[task]["num_action_landmarks"] = len(landmarks)
+    @property
+    def artifacts(self) -> list[str]:
+        return ["landmark"]
+
+    def prepare_task(self, task: Task, is_example: bool) -> tuple[dict[str, str], dict[any, any]]:
+        data, metadata = super().prepare_task(task, is_example)
+        landmarks = from_pyperplan(task, "landmark")
+        if self.ordered:
+            try:
+                landmarks = sort_landmarks(task, landmarks)
+            except RuntimeError as e:
+                raise RuntimeError(f"Failed to sort action landmarks: {e}")            
+        else:
+            random.Random(42).shuffle(landmarks)
+        data["action_landmarks"] = "\n".join(landmarks) if len(landmarks) > 0 else ""
+        metadata["action_landmarks"] = data["action_landmarks"]
+        metadata["num_action_landmarks"] = len(landmarks)
+        return data, metadata
 
 
 class DeleteRelaxedPlanPromptBuilder(PromptBuilder):
@@ -333,13 +384,17 @@ This is a plan for the $name instance above:
 $plan
 </plan-$name-example>""")
     
-    def process_task(self, task: Task, is_example: bool) -> None:
-        if not task in self.data:
-            _ = super().process_task(task, is_example)
-            delete_relaxed_plan = from_pyperplan(task, "delete_relaxed_plan")
-            self.data[task]["delete_relaxed_plan"] = "\n".join(delete_relaxed_plan) if len(delete_relaxed_plan) > 0 else ""
-            self.metadata[task]["delete_relaxed_plan"] = self.data[task]["delete_relaxed_plan"]
-            self.metadata[task]["delete_relaxed_plan_length"] = len(delete_relaxed_plan)
+    @property
+    def artifacts(self) -> list[str]:
+        return ["delete_relaxed_plan"]
+
+    def prepare_task(self, task: Task, is_example: bool) -> tuple[dict[str, str], dict[any, any]]:
+        data, metadata = super().prepare_task(task, is_example)
+        delete_relaxed_plan = from_pyperplan(task, "delete_relaxed_plan")
+        data["delete_relaxed_plan"] = "\n".join(delete_relaxed_plan) if len(delete_relaxed_plan) > 0 else ""
+        metadata["delete_relaxed_plan"] = data["delete_relaxed_plan"]
+        metadata["delete_relaxed_plan_length"] = len(delete_relaxed_plan)
+        return data, metadata
 
 AVAILABLE_PROMPT_BUILDERS : list[PromptBuilder] = [
     PromptBuilder(template="pddl", tag="-"),
@@ -351,13 +406,21 @@ AVAILABLE_PROMPT_BUILDERS : list[PromptBuilder] = [
     DeleteRelaxedPlanPromptBuilder(template="delete_relaxed_plan", tag="Delete Relaxation"),
 ]
 
+# One builder per full template string (template and kwargs); AVAILABLE_PROMPT_BUILDERS are never mutated
+_prompt_builders : dict[str, PromptBuilder] = {}
+_prompt_builders_lock = threading.Lock()
+
 def get_prompt_builder(template: str) -> PromptBuilder:
-    global AVAILABLE_PROMPT_BUILDERS
-    for pb in AVAILABLE_PROMPT_BUILDERS:
-        if pb.has_matching_template(template):
-            pb.set_template_kwargs(template)
-            return pb
-    return None
+    with _prompt_builders_lock:
+        if template not in _prompt_builders:
+            for pb in AVAILABLE_PROMPT_BUILDERS:
+                if pb.has_matching_template(template):
+                    _, kwargs = pb.parse_template(template)
+                    _prompt_builders[template] = pb.with_template_kwargs(kwargs)
+                    break
+            else:
+                return None
+        return _prompt_builders[template]
 
 def get_tag(template: str) -> str:
     try:
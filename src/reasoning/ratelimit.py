@@ -0,0 +1,164 @@
+import random
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    Callers reserve capacity up front and sleep for the returned delay, so
+    concurrent callers queue in order instead of polling.
+    """
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate : float = rate_per_minute / 60.0
+        self.capacity : float = capacity if capacity is not None else rate_per_minute
+        self.tokens : float = self.capacity
+        self.updated : float = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Reserves amount tokens and returns how long the caller must wait before using them.
+        """
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def adjust(self, amount: float) -> None:
+        """
+        Debits (positive) or refunds (negative) tokens after the real cost of a call is known.
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiterStats:
+    def __init__(self):
+        self.started : float = time.monotonic()
+        self.requests : int = 0
+        self.retries : int = 0
+        self.rate_limited : int = 0
+        self.throttled_time : float = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, requests: int = 0, retries: int = 0, rate_limited: int = 0, throttled_time: float = 0.0) -> None:
+        with self.lock:
+            self.requests += requests
+            self.retries += retries
+            self.rate_limited += rate_limited
+            self.throttled_time += throttled_time
+
+    @property
+    def achieved_rps(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.requests / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "throttled_time": round(self.throttled_time, 2),
+            "achieved_rps": round(self.achieved_rps, 3),
+        }
+
+
+def classify_error(e: Exception) -> str:
+    """
+    Classifies an exception raised by a model call as "rate_limit", "server", "client" or "unknown".
+    """
+    code = getattr(e, "code", None)
+    if not isinstance(code, int):
+        code = getattr(e, "status_code", None)
+    if not isinstance(code, int):
+        return "unknown"
+    if code == 429:
+        return "rate_limit"
+    if code >= 500:
+        return "server"
+    if code >= 400:
+        return "client"
+    return "unknown"
+
+
+class RateLimiter:
+    """
+    Request and token budgets for a single model, shared by every thread of the process.
+
+    Budgets are per minute; a budget of None is unlimited. After a rate-limit error
+    every caller pauses until the shared cooldown expires, so parallel workers back
+    off together instead of hammering the quota.
+    """
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.name : str = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.base_delay : float = base_delay
+        self.max_delay : float = max_delay
+        self.blocked_until : float = 0.0
+        self.lock = threading.Lock()
+        self.stats = RateLimiterStats()
+
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Blocks until one request of roughly tokens tokens fits into the budgets.
+        """
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens and tokens > 0:
+            wait = max(wait, self.tokens.reserve(tokens))
+        with self.lock:
+            wait = max(wait, self.blocked_until - time.monotonic())
+        if wait > 0:
+            time.sleep(wait)
+        self.stats.add(requests=1, throttled_time=max(wait, 0.0))
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """
+        Corrects the token budget once the real token usage of a request is known.
+        """
+        if self.tokens:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def backoff(self, attempt: int, error_class: str, base_delay: Optional[float] = None) -> float:
+        """
+        Sleeps with full-jitter exponential backoff before retry number attempt and returns the delay.
+
+        Rate-limit errors back off twice as long and block every caller of this limiter.
+        """
+        base = base_delay if base_delay else self.base_delay
+        if error_class == "rate_limit":
+            base *= 2
+        delay = random.uniform(0, min(self.max_delay, base * 2 ** attempt))
+        if error_class == "rate_limit":
+            with self.lock:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        self.stats.add(retries=1, rate_limited=int(error_class == "rate_limit"), throttled_time=delay)
+        time.sleep(delay)
+        return delay
+
+
+_rate_limiters : dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(name: str, **budgets) -> RateLimiter:
+    """
+    Returns the process-wide rate limiter for a model, creating it with budgets on first use.
+    """
+    with _rate_limiters_lock:
+        if name not in _rate_limiters:
+            _rate_limiters[name] = RateLimiter(name, **budgets)
+        return _rate_limiters[name]
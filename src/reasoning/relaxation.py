@@ -0,0 +1,204 @@
+"""
+Delete-relaxation analyses (reachability, hadd/hmax costs, relaxed plans and action landmarks) over
+a grounded task, with NumPy-backed fixpoint propagation.
+"""
+from typing import Optional
+
+import numpy as np
+
+from reasoning.pddl import GroundedTask, load_grounded_task
+
+def _csr(rows: list[list[int]], num_columns: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compressed sparse rows (pointers, indices) of a list of index lists; with num_columns, of its transpose.
+    """
+    if num_columns is None:
+        lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+        indices = np.fromiter((i for row in rows for i in row), dtype=np.int64, count=int(lengths.sum()))
+    else:
+        pairs = np.array([(column, row) for row, columns in enumerate(rows) for column in columns], dtype=np.int64).reshape(-1, 2)
+        order = np.argsort(pairs[:, 0], kind="stable")
+        lengths = np.bincount(pairs[:, 0], minlength=num_columns)
+        indices = pairs[order, 1]
+    pointers = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=pointers[1:])
+    return pointers, indices
+
+def _gather(pointers: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Concatenation of the given CSR rows, without a Python loop.
+    """
+    starts, ends = pointers[rows], pointers[rows + 1]
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return indices[:0]
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(total)]
+
+
+class RelaxedTask:
+    """
+    Integer-indexed view of a grounded task for delete-relaxation fixpoints.
+
+    Reachability runs layer by layer: the facts reached in a layer decrement the unsatisfied
+    precondition counters of the operators that need them, and the operators whose counter drops
+    to zero add their effects to the next layer.
+    """
+    def __init__(self, task: GroundedTask):
+        self.task : GroundedTask = task
+        self.num_facts : int = len(task.facts)
+        self.num_operators : int = len(task.operators)
+        preconditions = [sorted(set(pre)) for pre in task.preconditions]
+        self.pre_count : np.ndarray = np.array([len(pre) for pre in preconditions], dtype=np.int64)
+        self.pre_pointers, self.pre_indices = _csr(preconditions)
+        self.add_pointers, self.add_indices = _csr(task.add_effects)
+        # Transposed preconditions: fact -> operators that need it
+        self.consumer_pointers, self.consumer_indices = _csr(preconditions, self.num_facts)
+        self.initial_state : np.ndarray = np.array(sorted(set(task.initial_state)), dtype=np.int64)
+        self.goals : np.ndarray = np.array(sorted(set(task.goals)), dtype=np.int64)
+
+    def reachable(self, disabled: Optional[np.ndarray] = None, stop_at_goals: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Runs relaxed reachability from the initial state without the disabled operators.
+
+        Returns the first achiever of every fact (-1 for initial facts, -2 for unreached ones) and
+        the layer of every operator (-1 if never applicable).
+        """
+        achiever = np.full(self.num_facts, -2, dtype=np.int64)
+        achiever[self.initial_state] = -1
+        layer = np.full(self.num_operators, -1, dtype=np.int64)
+        remaining = self.pre_count.copy()
+        if disabled is not None:
+            # Disabled operators can never reach a zero counter
+            remaining[disabled] = np.iinfo(np.int64).max // 2
+        frontier = self.initial_state
+        enabled = np.flatnonzero(remaining == 0)
+        depth = 0
+        while True:
+            consumers = _gather(self.consumer_pointers, self.consumer_indices, frontier)
+            if len(consumers):
+                np.subtract.at(remaining, consumers, 1)
+                candidates = np.unique(consumers)
+                enabled = np.concatenate([enabled, candidates[remaining[candidates] == 0]])
+            if not len(enabled):
+                break
+            layer[enabled] = depth
+            added = _gather(self.add_pointers, self.add_indices, enabled)
+            producers = np.repeat(enabled, self.add_pointers[enabled + 1] - self.add_pointers[enabled])
+            new = achiever[added] == -2
+            added, producers = added[new], producers[new]
+            # The first operator listed for a fact becomes its achiever
+            facts, first = np.unique(added, return_index=True)
+            achiever[facts] = producers[first]
+            frontier, enabled = facts, enabled[:0]
+            depth += 1
+            if stop_at_goals and np.all(achiever[self.goals] != -2):
+                break
+            if not len(frontier):
+                break
+        return achiever, layer
+
+    def goals_reachable(self, disabled: Optional[np.ndarray] = None) -> bool:
+        achiever, _ = self.reachable(disabled, stop_at_goals=True)
+        return bool(np.all(achiever[self.goals] != -2))
+
+    def costs(self, heuristic: str = "hadd") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Propagates unit-cost hadd or hmax values from the initial state until a fixpoint.
+
+        Every round evaluates all operators at once (sum or max of their precondition costs) and
+        lowers every fact to the cheapest operator adding it. Returns the fact costs, the operator
+        costs (inf if unreachable) and the best supporter of every fact, with the conventions of
+        reachable (-1 for initial facts, -2 for unreached ones; ties go to the lowest operator index).
+        """
+        if heuristic not in ("hadd", "hmax"):
+            raise ValueError(f"Unknown relaxation heuristic: {heuristic}")
+        reduce = np.add if heuristic == "hadd" else np.maximum
+        fact_cost = np.full(self.num_facts, np.inf)
+        fact_cost[self.initial_state] = 0.0
+        op_cost = np.zeros(self.num_operators)
+        nonempty = self.pre_count > 0
+        starts = self.pre_pointers[:-1][nonempty]
+        add_sources = np.repeat(np.arange(self.num_operators), np.diff(self.add_pointers))
+        while True:
+            if len(starts):
+                op_cost[nonempty] = reduce.reduceat(fact_cost[self.pre_indices], starts)
+            updated = fact_cost.copy()
+            np.minimum.at(updated, self.add_indices, op_cost[add_sources] + 1)
+            if np.array_equal(updated, fact_cost):
+                break
+            fact_cost = updated
+
+        supporter = np.full(self.num_facts, -2, dtype=np.int64)
+        supporter[np.isfinite(fact_cost)] = -1
+        values = op_cost[add_sources] + 1
+        best = np.isfinite(values) & (values == fact_cost[self.add_indices]) & (fact_cost[self.add_indices] > 0)
+        facts, operators = self.add_indices[best], add_sources[best]
+        # Pairs are in operator order, so the first pair of each fact has the lowest operator index
+        facts, first = np.unique(facts, return_index=True)
+        supporter[facts] = operators[first]
+        return fact_cost, op_cost, supporter
+
+    def relaxed_plan(self, achiever: Optional[np.ndarray] = None, order: Optional[np.ndarray] = None) -> Optional[list[int]]:
+        """
+        Operators of a relaxed plan obtained by backchaining from the goals over achievers (default:
+        first achievers), or None if the goals are unreachable. With order, the operators are sorted
+        by it (then by index), e.g. by their hadd or hmax costs, which yields an executable sequence.
+        """
+        if achiever is None:
+            achiever, _ = self.reachable(stop_at_goals=True)
+        if np.any(achiever[self.goals] == -2):
+            return None
+        selected = np.zeros(self.num_operators, dtype=bool)
+        visited = np.zeros(self.num_facts, dtype=bool)
+        frontier = self.goals
+        while len(frontier):
+            visited[frontier] = True
+            operators = np.unique(achiever[frontier])
+            operators = operators[operators >= 0]
+            operators = operators[~selected[operators]]
+            selected[operators] = True
+            preconditions = np.unique(_gather(self.pre_pointers, self.pre_indices, operators))
+            frontier = preconditions[~visited[preconditions]]
+        operators = np.flatnonzero(selected)
+        if order is not None:
+            operators = operators[np.argsort(order[operators], kind="stable")]
+        return operators.tolist()
+
+    def action_landmarks(self) -> list[int]:
+        """
+        Operators without which the goals are unreachable in the delete relaxation.
+
+        Every such operator belongs to every relaxed plan, so only the operators of one relaxed plan
+        are tested, each by rerunning reachability with that operator disabled.
+        """
+        candidates = self.relaxed_plan()
+        if candidates is None:
+            return []
+        return [
+            op for op in candidates
+            if not self.goals_reachable(np.array([op], dtype=np.int64))
+        ]
+
+
+def compute_action_landmarks(domain_path: str, instance_path: str) -> list[str]:
+    """
+    Names of the delete-relaxation action landmarks of a task, sorted like pyperplan reports them.
+    """
+    task = load_grounded_task(domain_path, instance_path)
+    relaxed_task = RelaxedTask(task)
+    return sorted(task.operators[op] for op in relaxed_task.action_landmarks())
+
+def compute_delete_relaxed_plan(domain_path: str, instance_path: str, heuristic: str = "hadd") -> Optional[list[str]]:
+    """
+    Names of the operators of a relaxed plan of a task, following the best supporters of heuristic and
+    ordered by cost, or None if the goals are unreachable even without delete effects.
+    """
+    task = load_grounded_task(domain_path, instance_path)
+    relaxed_task = RelaxedTask(task)
+    _, op_cost, supporter = relaxed_task.costs(heuristic)
+    plan = relaxed_task.relaxed_plan(supporter, order=op_cost)
+    if plan is None:
+        return None
+    return [task.operators[op] for op in plan]
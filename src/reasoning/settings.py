@@ -3,15 +3,54 @@ DATA_DIR = "data/"
 
 # BENCHMARKS
 BENCHMARKS_DIR = os.path.join(DATA_DIR, "benchmarks")
+BENCHMARK_CATALOG_FILE_NAME = "catalog.json"
+# PDDL files at least this large are read through mmap
+PDDL_MMAP_THRESHOLD = 1024 * 1024
 
 # EXPERIMENTS
 EXPERIMENTS_DIR = os.path.join(DATA_DIR, "experiments")
 VALIDATION_FILE_NAME = "validation_results.csv"
 PASS_AT_K_METRIC_FILE_NAME = "pass@k.csv"
+METRICS_BY_ATTEMPT_FILE_NAME = "metrics_by_attempt.csv"
 ERROR_TYPES_FILE_NAME = "error_types.csv"
 PROMPT_FILE_NAME = "prompt.log"
 SAMPLE_FILE_NAME = "sample_{}.log"
 VALIDATED_LOG_FILE_FILE_NAME = "sample_{}.val"
+VALIDATION_VERDICT_FILE_NAME = "sample_{}.val.json"
+METADATA_FILE_NAME = "metadata.csv"
+METADATA_JOURNAL_FILE_NAME = "metadata.jsonl"
+
+# RESULTS
+# Parquet tables of validation results and generation metadata, partitioned by experiment/model/template/domain
+RESULTS_DIR = os.path.join(DATA_DIR, "results")
+# Rows buffered per experiment before they are appended to the store as one part file
+RESULTS_CHUNK_ROWS = 10000
+
+# PROMPTS
+# Precompiled prompt bundles, one gzipped JSON Lines file per (templates x domains x instances) grid
+PROMPT_BUNDLES_DIR = os.path.join(DATA_DIR, "prompts")
+PROMPT_BUNDLE_FILE_NAME = "bundle-{}.jsonl.gz"
 
 # SOLUTIONS
-SOLUTIONS_DIR_NAME = "solutions"
\ No newline at end of file
+SOLUTIONS_DIR_NAME = "solutions"
+ARTIFACTS_MANIFEST_FILE_NAME = "manifest.json"
+
+# VALIDATOR
+VAL_BINARY = "res/val/build/bin/Validate"
+# "val" runs the VAL binary, "native" the in-process simulator, "crosscheck" both
+VALIDATION_BACKEND = os.environ.get("REASONING_VALIDATION_BACKEND", "val")
+# Sample logs open <response> within their first lines; past this many bytes the response is considered missing
+RESPONSE_SCAN_LIMIT = 64 * 1024
+# Sample logs of at least this many bytes (e.g. with long thoughts) are memory-mapped instead of read
+RESPONSE_MMAP_THRESHOLD = 256 * 1024
+
+# PLANNER
+# "native" computes the artifacts it supports (action landmarks, delete-relaxed plans) without pyperplan and runs pyperplan
+# in-process for the others, "inprocess" runs pyperplan inside the interpreter, "subprocess" calls the pyperplan CLI
+PLANNER_BACKEND = os.environ.get("REASONING_PLANNER_BACKEND", "native")
+
+# CACHE
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+RESPONSE_CACHE_FILE_NAME = "responses.sqlite"
+EXPERIMENT_INDEX_FILE_NAME = "experiment_index.json"
+METRICS_STATE_FILE_NAME = "metrics_{}.json"
@@ -0,0 +1,225 @@
+import os
+import time
+import uuid
+from typing import Iterable, Optional
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from reasoning.settings import RESULTS_DIR
+
+# Directory levels of every table: <table>/experiment=<e>/model=<m>/template=<t>/domain=<d>/part-*.parquet
+PARTITION_COLUMNS = ["experiment", "model", "template", "domain"]
+
+# Typed columns and row key (within a partition) of each table; columns not listed here keep their inferred type.
+TABLES : dict[str, dict] = {
+    "validation": {
+        "key": ["instance", "sample_id"],
+        "columns": {
+            "instance": pa.string(),
+            "sample_id": pa.int32(),
+            "valid": pa.bool_(),
+            "error": pa.string(),
+            "num_action_landmarks": pa.int32(),
+            "num_action_landmarks_used": pa.int32(),
+            "backend_mismatch": pa.bool_(),
+        },
+    },
+    "metadata": {
+        "key": ["instance", "sample_id"],
+        "columns": {
+            "instance": pa.string(),
+            "sample_id": pa.int32(),
+            "num_requests": pa.int32(),
+            "prompt_token_count": pa.int64(),
+            "candidates_token_count": pa.int64(),
+            "total_tokens_count": pa.int64(),
+        },
+    },
+}
+
+def _as_filter(value: None | str | Iterable[str]) -> Optional[set[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return {value}
+    return set(value)
+
+def _read_part(path: str, columns: Optional[list[str]] = None) -> pd.DataFrame:
+    if columns is not None:
+        # Columns a part does not have (e.g. metadata of another model) are read as missing values
+        available = set(pq.read_schema(path).names)
+        df = pq.read_table(path, columns=[column for column in columns if column in available]).to_pandas()
+        return df.reindex(columns=columns)
+    return pq.read_table(path).to_pandas()
+
+def _to_arrow(df: pd.DataFrame, table: str) -> pa.Table:
+    """
+    Converts the non-partition columns of df to an Arrow table with the declared column types.
+    """
+    columns = TABLES[table]["columns"]
+    arrays, fields = [], []
+    for name in df.columns:
+        if name in PARTITION_COLUMNS:
+            continue
+        values = df[name]
+        if name in columns:
+            type_ = columns[name]
+            if pa.types.is_integer(type_):
+                values = pd.to_numeric(values, errors="coerce").astype("Int64")
+            elif pa.types.is_boolean(type_):
+                values = values.map(lambda v: v if pd.isna(v) else str(v).strip().lower() in ("true", "1"), na_action="ignore").astype("boolean")
+            elif pa.types.is_string(type_):
+                values = values.astype("string")
+            array = pa.array(values, type=type_, from_pandas=True)
+        else:
+            array = pa.array(values, from_pandas=True)
+        arrays.append(array)
+        fields.append(pa.field(name, array.type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+class ResultsStore:
+    """
+    Columnar (Parquet) store of validation results and generation metadata.
+
+    Each table is partitioned by experiment, model, template and domain. Appends add a new part
+    file to the touched partitions; compaction merges the parts of a partition into one file,
+    keeping the most recent row for every key. Reads only open the partitions matching the
+    filters and only decode the requested columns.
+    """
+    def __init__(self, root: str = RESULTS_DIR):
+        self.root : str = root
+
+    def _partition_dir(self, table: str, values: tuple[str, ...]) -> str:
+        segments = [f"{column}={quote(str(value), safe='')}" for column, value in zip(PARTITION_COLUMNS, values)]
+        return os.path.join(self.root, table, *segments)
+
+    def _parts(self, partition_dir: str) -> list[str]:
+        # Part names start with their creation time, so lexicographic order is write order
+        return sorted(
+            os.path.join(partition_dir, name) for name in os.listdir(partition_dir)
+            if name.startswith("part-") and name.endswith(".parquet")
+        )
+
+    def _write_part(self, partition_dir: str, data: pa.Table) -> str:
+        os.makedirs(partition_dir, exist_ok=True)
+        path = os.path.join(partition_dir, f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet")
+        temp_path = path + ".tmp"
+        pq.write_table(data, temp_path)
+        os.replace(temp_path, path)
+        return path
+
+    def partitions(self, table: str,
+            experiment: None | str | Iterable[str] = None,
+            model: None | str | Iterable[str] = None,
+            template: None | str | Iterable[str] = None,
+            domain: None | str | Iterable[str] = None) -> list[tuple[tuple[str, ...], str]]:
+        """
+        Returns the (partition values, directory) of every partition of table matching the filters.
+        """
+        filters = [_as_filter(f) for f in (experiment, model, template, domain)]
+        partitions = []
+
+        def walk(path: str, level: int, values: tuple[str, ...]):
+            if level == len(PARTITION_COLUMNS):
+                partitions.append((values, path))
+                return
+            prefix = f"{PARTITION_COLUMNS[level]}="
+            with os.scandir(path) as entries:
+                names = sorted(entry.name for entry in entries if entry.is_dir() and entry.name.startswith(prefix))
+            for name in names:
+                value = unquote(name[len(prefix):])
+                if filters[level] is None or value in filters[level]:
+                    walk(os.path.join(path, name), level + 1, values + (value,))
+
+        table_dir = os.path.join(self.root, table)
+        if os.path.isdir(table_dir):
+            walk(table_dir, 0, ())
+        return partitions
+
+    def append(self, table: str, df: pd.DataFrame) -> list[tuple[str, ...]]:
+        """
+        Appends the rows of df (which must carry the partition columns) and returns the touched partitions.
+        """
+        if table not in TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        missing = [column for column in PARTITION_COLUMNS if column not in df.columns]
+        if missing:
+            raise ValueError(f"Missing partition columns: {missing}")
+        touched = []
+        for values, group in df.groupby(PARTITION_COLUMNS, sort=False):
+            values = tuple(str(value) for value in values)
+            self._write_part(self._partition_dir(table, values), _to_arrow(group, table))
+            touched.append(values)
+        return touched
+
+    def part_files(self, table: str, **filters) -> list[str]:
+        """
+        Paths of the part files of every partition matching the filters.
+        """
+        return [part for _, partition_dir in self.partitions(table, **filters) for part in self._parts(partition_dir)]
+
+    def remove(self, parts: Iterable[str]) -> None:
+        """
+        Deletes part files, e.g. the parts a full rewrite of their partitions superseded.
+        """
+        for part in parts:
+            try:
+                os.remove(part)
+            except FileNotFoundError:
+                pass
+
+    def compact(self, table: str, **filters) -> None:
+        """
+        Merges the part files of every partition matching the filters into a single part.
+        """
+        key = TABLES[table]["key"]
+        for _, partition_dir in self.partitions(table, **filters):
+            parts = self._parts(partition_dir)
+            if len(parts) < 2:
+                continue
+            df = pd.concat([_read_part(part) for part in parts], ignore_index=True)
+            df = df.drop_duplicates(subset=key, keep="last").sort_values(key, kind="stable")
+            # The merged part sorts after the parts it replaces, so readers never miss rows
+            self._write_part(partition_dir, _to_arrow(df, table))
+            for part in parts:
+                os.remove(part)
+
+    def read(self, table: str, columns: Optional[list[str]] = None, **filters) -> pd.DataFrame:
+        """
+        Loads the requested columns (default: all) of the partitions matching the filters.
+
+        Partition columns are restored from the directory names; rows appended more than once
+        since the last compaction are deduplicated, keeping the most recent.
+        """
+        key = TABLES[table]["key"]
+        file_columns = None
+        if columns is not None:
+            file_columns = [column for column in columns if column not in PARTITION_COLUMNS]
+            file_columns += [column for column in key if column not in file_columns]
+        frames = []
+        for values, partition_dir in self.partitions(table, **filters):
+            parts = self._parts(partition_dir)
+            if not parts:
+                continue
+            df = pd.concat(
+                [_read_part(part, file_columns) for part in parts],
+                ignore_index=True,
+            )
+            if len(parts) > 1:
+                df = df.drop_duplicates(subset=key, keep="last")
+            for column, value in zip(PARTITION_COLUMNS, values):
+                df[column] = value
+            frames.append(df)
+        if not frames:
+            return pd.DataFrame(columns=columns if columns is not None else PARTITION_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        if columns is None:
+            return df[PARTITION_COLUMNS + [column for column in df.columns if column not in PARTITION_COLUMNS]]
+        return df[columns]
+
+
+RESULTS_STORE = ResultsStore()
@@ -0,0 +1,146 @@
+"""
+Single-pass tokenizer of the <tag>...</tag> sections of prompts, sample logs and planner outputs.
+"""
+import mmap
+import os
+import re
+from typing import Optional
+
+TAG_PATTERN = re.compile(r"<(/?)([A-Za-z][\w.-]*)>")
+TAG_BYTES_PATTERN = re.compile(rb"<(/?)([A-Za-z][\w.-]*)>")
+
+# Tag of every object type that extract understands
+OBJECT_TAGS : dict[str, str] = {
+    "landmark": "action-landmarks-set",
+    "plan": "plan",
+    "delete_relaxed_plan": "delete-relaxed-plan",
+    "sample": "sample",
+    "domain": "domain-file",
+    "instance": "instance-file",
+    "metadata": "metadata",
+    "response": "response",
+}
+
+# Objects whose last occurrence is the one that counts (a response may draft several plans)
+LAST_OCCURRENCE_OBJECTS = {"plan"}
+
+
+class TaggedDocument:
+    """
+    Offsets of every tagged section of a document, found in a single scan.
+
+    Sections are (start, end) offsets of their content, between the opening and closing tags,
+    listed per tag in document order; an opening tag is closed by the next closing tag of the same
+    name. Content is only sliced out of the document when a section is requested. Documents can be
+    str or bytes-like (e.g. a memory-mapped file), in which case offsets are byte offsets.
+    With until, the scan stops at the first closing tag of that name, so trailing sections (e.g. a
+    long <thought> after the <response>) are never read.
+    """
+    def __init__(self, content: str | bytes, sections: Optional[dict[str, list[tuple[int, int]]]] = None, until: Optional[str] = None):
+        self.content : str | bytes = content
+        self.sections : dict[str, list[tuple[int, int]]] = {}
+        if sections is not None:
+            self.sections = sections
+            return
+        is_str = isinstance(content, str)
+        match_tag = (TAG_PATTERN if is_str else TAG_BYTES_PATTERN).match
+        find = content.find
+        bracket = "<" if is_str else b"<"
+        opened : dict[str, int] = {}
+        # Jump from "<" to "<" with find (memchr speed) and only try the tag pattern there
+        position = find(bracket)
+        while position != -1:
+            match = match_tag(content, position)
+            if match is None:
+                position = find(bracket, position + 1)
+                continue
+            closing, name = match.group(1, 2)
+            if not is_str:
+                name = name.decode("ascii")
+            if not closing:
+                opened.setdefault(name, match.end())
+            elif name in opened:
+                self.sections.setdefault(name, []).append((opened.pop(name), position))
+                if name == until:
+                    break
+            position = find(bracket, match.end())
+
+    def __contains__(self, tag: str) -> bool:
+        return tag in self.sections
+
+    def spans(self, tag: str) -> list[tuple[int, int]]:
+        """
+        Offsets of the content of every occurrence of tag.
+        """
+        return list(self.sections.get(tag, []))
+
+    def section(self, tag: str, occurrence: int = 0) -> Optional[str]:
+        """
+        Raw content of an occurrence of tag (negative occurrences count from the end), or None.
+        """
+        spans = self.sections.get(tag, [])
+        if not -len(spans) <= occurrence < len(spans):
+            return None
+        start, end = spans[occurrence]
+        content = self.content[start:end]
+        return content if isinstance(content, str) else bytes(content).decode("utf-8", errors="replace")
+
+    def subdocument(self, tag: str, occurrence: int = 0) -> Optional["TaggedDocument"]:
+        """
+        View of the sections nested in an occurrence of tag, without scanning its content again.
+        """
+        spans = self.sections.get(tag, [])
+        if not -len(spans) <= occurrence < len(spans):
+            return None
+        start, end = spans[occurrence]
+        sections = {}
+        for name, name_spans in self.sections.items():
+            nested = [(s, e) for s, e in name_spans if start <= s and e <= end and (s, e) != (start, end)]
+            if nested:
+                sections[name] = nested
+        return TaggedDocument(self.content, sections)
+
+    def extract(self, obj: str, return_str: bool = False):
+        """
+        Non-empty stripped lines of an object's section (joined with return_str), like utils.extract.
+        """
+        if obj not in OBJECT_TAGS:
+            raise ValueError(f"Unknown object type: {obj}")
+        content = self.section(OBJECT_TAGS[obj], -1 if obj in LAST_OCCURRENCE_OBJECTS else 0)
+        if content is None:
+            raise ValueError(f"Object {obj} not found in the output.")
+        items = [line.strip() for line in content.splitlines() if line.strip()]
+        return "\n".join(items) if return_str else items
+
+
+def _slice_section(buffer: bytes | mmap.mmap, tag: str, scan_limit: Optional[int]) -> Optional[str]:
+    open_tag, close_tag = f"<{tag}>".encode("ascii"), f"</{tag}>".encode("ascii")
+    start = buffer.find(open_tag, 0, scan_limit if scan_limit is not None else len(buffer))
+    if start == -1:
+        return None
+    end = buffer.find(close_tag, start + len(open_tag))
+    if end == -1:
+        return None
+    return buffer[start:end + len(close_tag)].decode("utf-8", errors="replace")
+
+def read_section(path: str, tag: str, scan_limit: Optional[int] = None, mmap_threshold: int = 0) -> Optional[TaggedDocument]:
+    """
+    Tokenizes only the first <tag> section of a file, or returns None if it has none.
+
+    The opening tag is searched within the first scan_limit bytes (default: the whole file) and the
+    closing tag from there on. Files of at least mmap_threshold bytes are memory-mapped, so only the
+    pages up to the end of the section are ever read; smaller ones are read at once.
+    The returned document holds the sections nested in the tag, decoded from that slice alone.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return None
+        if size < mmap_threshold:
+            content = _slice_section(f.read(), tag, scan_limit)
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                content = _slice_section(mapped, tag, scan_limit)
+    if content is None:
+        return None
+    return TaggedDocument(content).subdocument(tag)
@@ -1,7 +1,29 @@
-from reasoning.settings import SOLUTIONS_DIR_NAME
-import threading
+from reasoning.settings import SOLUTIONS_DIR_NAME, PDDL_MMAP_THRESHOLD
+from functools import lru_cache
+import mmap
 
-lock = threading.Lock()
+def normalize_pddl_lines(lines) -> str:
+    # Remove comments and empty lines
+    _content = []
+    for line in lines:
+        line = line.strip()
+        if line.startswith(";") or line == "":
+            continue
+        _content.append(line)
+    return "\n".join(_content)
+
+@lru_cache(maxsize=512)
+def read_pddl(path: str, mtime_ns: int, size: int) -> str:
+    """
+    Normalized content of a PDDL file, memoized per (path, mtime, size) so every thread shares one copy
+    and a modified file is read again. Files of at least PDDL_MMAP_THRESHOLD bytes are scanned
+    line by line through a memory map instead of being read into a buffer first.
+    """
+    if size >= PDDL_MMAP_THRESHOLD:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return normalize_pddl_lines(line.decode("utf-8") for line in iter(m.readline, b""))
+    with open(path, "r", encoding='utf-8') as f:
+        return normalize_pddl_lines(f.read().splitlines())
 
 class PDDLResource:
     def __init__(self, name : str, path : str):
@@ -22,16 +44,8 @@ class PDDLResource:
         return self.path < other.path
 
     def read(self) -> str:
-        with lock:
-            with open(self.path, "r", encoding='utf-8') as f:
-                content = f.read()
-                # Remove comments and empty lines
-                _content = []
-                for line in content.splitlines():
-                    if line.strip().startswith(";") or line.strip() == "":
-                        continue
-                    _content.append(line.strip())
-                return "\n".join(_content)
+        stat = os.stat(self.path)
+        return read_pddl(self.path, stat.st_mtime_ns, stat.st_size)
     
     def __str__(self):
         fields = ", ".join(f"{key}={value}" for key, value in self.__dict__.items())
@@ -95,28 +109,8 @@ import os
 import re 
 
 def get_tasks(domain : str)-> list[Task]:
-    domain_dir_path = os.path.join(settings.BENCHMARKS_DIR, domain)
-    if not os.path.isdir(domain_dir_path):
-        raise ValueError(f"Domain directory '{domain_dir_path}' does not exist.")
-    domain_path = os.path.join(domain_dir_path, "domain.pddl")
-    if not os.path.isfile(domain_path):
-        raise ValueError(f"Domain file '{domain_path}' does not exist.")
-    d = Domain(
-        name=domain,
-        path=domain_path
-    )
-    instance_dir_path = os.path.join(domain_dir_path, "instances")
-    if not os.path.isdir(instance_dir_path):
-        raise ValueError(f"Instance directory '{instance_dir_path}' does not exist.")
-    tasks = []
-    for root, dirs, files in os.walk(instance_dir_path):
-        for instance_file in files:
-            if not instance_file.endswith('.pddl'):
-                continue
-            instance_path = os.path.join(root, instance_file)
-            i = Instance(
-                name=instance_file.replace('.pddl', '').strip(),
-                path=instance_path
-            )
-            tasks.append(Task(d, i))
-    return tasks
\ No newline at end of file
+    """
+    All tasks of a benchmark domain, materialized from its catalog (see reasoning.catalog).
+    """
+    from reasoning.catalog import BenchmarkCatalog
+    return BenchmarkCatalog(domain).tasks()
@@ -1,7 +1,9 @@
 import subprocess
+from reasoning.settings import VAL_BINARY
 
 from typing import Optional
 from reasoning.task import Task
+from reasoning.tags import TaggedDocument
 """
 pyperplan -s astar -H actionlandmark ./data/raw/blocksworld/generated_domain.pddl ./data/raw/blocksworld/generated_basic/instance-1.pddl 
 2025-07-28 15:42:30,514 INFO     using search: astar_search
@@ -27,107 +29,25 @@ import os
 def from_pyperplan(task: Task, obj: str) -> None | str | list[str]:
     """
     Get a specific object from the pyperplan output for a task.
+
+    Artifacts are served by the planner artifact store (see reasoning.planner).
     """
-    if obj == "landmark":
-        extension = ".pddl.lndmk"
-        command = [
-            "pyperplan",
-            "-s", "astar",
-            "-H", "actionlandmark",
-            task.domain.path,
-            task.instance.path
-        ]
-    elif obj == "delete_relaxed_plan":
-        extension = ".pddl.soln.rlx"
-        command = [
-            "pyperplan",
-            "-s", "gbf",
-            "-H", "hffpo",
-            task.domain.path,
-            task.instance.path
-        ]
-    elif obj == "plan":
-        extension = ".pddl.soln"
-        command = [
-            "pyperplan",
-            "-s", "gbf",
-            "-H", "hff",
-            task.domain.path,
-            task.instance.path
-        ]
-    else:
-        raise ValueError(f"Unknown object type: {obj}")
-    if obj != "plan":
-        path = task.get_solution_path(extension)
-        if os.path.exists(path):
-            with open(path, 'r') as f:
-                content = f.read()
-        else:
-            result = subprocess.run(command, capture_output=True, text=True)
-            if result.returncode != 0:
-                raise RuntimeError(f"Error running pyperplan for task {task}: {result.stderr}")
-            content = result.stdout
-            with open(path, 'w') as f:
-                f.write(content)
-        return extract(content, obj)
-    else:
-        path = task.get_solution_path(extension)
-        if not os.path.exists(path):
-            result = subprocess.run(command, capture_output=True, text=True)
-            if result.returncode != 0:
-                raise RuntimeError(f"Error running pyperplan for task {task}: {result.stderr}")
-        with open(path, 'r') as f:
-            content = f.read()
-        return content.splitlines()
+    from reasoning.planner import from_pyperplan as _from_pyperplan
+    return _from_pyperplan(task, obj)
             
-def extract(content : str, obj: str, return_str: bool = False):
-    if obj == "landmark":
-        start_mark = "<action-landmarks-set>"
-        end_mark = "</action-landmarks-set>"
-    elif obj == "plan":
-        start_mark = "<plan>"
-        end_mark = "</plan>"
-    elif obj == "delete_relaxed_plan":
-        start_mark = "<delete-relaxed-plan>"
-        end_mark = "</delete-relaxed-plan>"
-    elif obj == "sample":
-        start_mark = "<sample>"
-        end_mark = "</sample>"
-    elif obj == "domain":
-        start_mark = "<domain-file>"
-        end_mark = "</domain-file>"
-    elif obj == "instance":
-        start_mark = "<instance-file>"
-        end_mark = "</instance-file>"
-    elif obj == "metadata":
-        start_mark = "<metadata>"
-        end_mark = "</metadata>"
-    elif obj == "response":
-        start_mark = "<response>"
-        end_mark = "</response>"
-    else:
-        raise ValueError(f"Unknown object type: {obj}")
-    start_index = content.find(start_mark)
-    end_index = content.find(end_mark)
-
-    if start_index == -1 or end_index == -1:
-        raise ValueError(f"Object {obj} not found in the output.")
-    str_to_extract = content[start_index + len(start_mark):end_index].strip()
-
-    extracted_items = []
-    for line in str_to_extract.splitlines():
-        stripped_line = line.strip()
-        if stripped_line and stripped_line not in ["", "\n"]:
-            extracted_items.append(stripped_line)
-
-    if return_str:
-        return "\n".join(extracted_items)
-    else:
-        return extracted_items
+def extract(content : "str | TaggedDocument", obj: str, return_str: bool = False):
+    """
+    Non-empty stripped lines of the section of obj (e.g. "<plan>...</plan>"), or the lines joined with return_str.
+
+    The last plan of a content wins; for every other object the first section is used. Pass a
+    TaggedDocument to extract several objects from one scan of the content.
+    """
+    document = content if isinstance(content, TaggedDocument) else TaggedDocument(content)
+    return document.extract(obj, return_str)
 
 def val(domain_path : str, instance_path: str, plan_path : str, save_path: Optional[str]) -> tuple[bool, Optional[str]]:
     command = [
-        f"res/val/build/bin/Validate",
+        VAL_BINARY,
         "-v",
         "-t", "0.001",
         domain_path,
@@ -178,76 +98,119 @@ def from_config(config_path: str):
     
     return config
 
-from typing import Callable, Any, List
+from typing import Callable, Any, List, Iterable, Iterator
 import os 
+from concurrent.futures import Executor, FIRST_COMPLETED, ThreadPoolExecutor, wait
 from reasoning.settings import EXPERIMENTS_DIR
+from reasoning.index import ExperimentIndex
+def iter_log_files(callback_fn: Callable[[str, str, str, str, str, str], Any],
+        continue_on_error: bool = True,
+        verbose: bool = True,
+        executor: Executor | None = None,
+        max_pending: int | None = None,
+        ordered: bool = False,
+        experiment: None | str | Iterable[str] = None,
+        model: None | str | Iterable[str] = None,
+        template: None | str | Iterable[str] = None,
+        domain: None | str | Iterable[str] = None) -> Iterator[Any]:
+        """
+        Applies a callback function to each log file of the experiments matching the filters and yields the results.
+
+        Args:
+            callback_fn: Function that takes (exp, model, template, domain, instance, log_file) as arguments
+            continue_on_error: If True, continues processing after errors in the callback
+            executor: If given, callbacks run on it and results are yielded as they complete
+            max_pending: Number of callbacks running or queued on the executor at any time (default: 4 per core)
+            ordered: If True, results are yielded in traversal order; callbacks still run as soon as a slot
+                frees up, so a slow file only holds back the results after it, not the other callbacks
+            experiment, model, template, domain: Name or collection of names to restrict the traversal to
+
+        Yields:
+            The result of each successful callback invocation
+        """
+        index = ExperimentIndex(EXPERIMENTS_DIR)
+        jobs = (
+            (r.experiment, r.model, r.template, r.domain, r.instance, r.path)
+            for r in index.records(experiment=experiment, model=model, template=template, domain=domain)
+            if r.path.endswith(".log")
+        )
+
+        def run(job):
+            try:
+                return True, callback_fn(*job)
+            except Exception as e:
+                if verbose:
+                    print(f"Error processing {job[-1]}: {e}")
+                if not continue_on_error:
+                    raise e
+                return False, None
+
+        if executor is None:
+            for job in jobs:
+                ok, result = run(job)
+                if ok:
+                    yield result
+            return
+
+        # Keep a bounded window of submitted jobs, tagged with their traversal position, and refill it
+        # as soon as any job completes, so results stream out without queueing the whole tree
+        max_pending = max_pending or 4 * (os.cpu_count() or 1)
+        pending = {}
+        # Completed jobs waiting for an earlier one, in ordered mode
+        completed = {}
+        next_position = 0
+
+        def collect():
+            nonlocal next_position
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=pending.get):
+                position = pending.pop(future)
+                completed[position] = future.result()
+            if not ordered:
+                positions = sorted(completed)
+            else:
+                positions = []
+                while next_position in completed:
+                    positions.append(next_position)
+                    next_position += 1
+            for position in positions:
+                ok, result = completed.pop(position)
+                if ok:
+                    yield result
+
+        for position, job in enumerate(jobs):
+            pending[executor.submit(run, job)] = position
+            if len(pending) >= max_pending:
+                yield from collect()
+        while pending:
+            yield from collect()
+
 def process_log_files(callback_fn: Callable[[str, str, str, str, str, str], Any], 
         continue_on_error: bool = True,
-        verbose: bool = True) -> List[Any]:
+        verbose: bool = True,
+        max_workers: int = 1,
+        **filters) -> List[Any]:
         """
         Applies a callback function to each log file found in a nested directory structure.
         
         Args:
             callback_fn: Function that takes (exp, model, template, domain, instance_file) as arguments
-            base_dir: The base directory to start the traversal
             continue_on_error: If True, continues processing after errors in the callback
+            max_workers: Number of threads running the callback concurrently
+            filters: experiment, model, template and domain filters, see iter_log_files
             
         Returns:
             List of results from each callback invocation
         """
-        results = []
-
-        for exp in os.listdir(EXPERIMENTS_DIR):
-            exp_dir = os.path.join(EXPERIMENTS_DIR, exp)
-            if not os.path.isdir(exp_dir):
-                continue
-
-            for model in os.listdir(exp_dir):
-                model_dir = os.path.join(exp_dir, model)
-                if not os.path.isdir(model_dir):
-                    continue
-
-                for template in os.listdir(model_dir):
-                    template_dir = os.path.join(model_dir, template)
-                    if not os.path.isdir(template_dir):
-                        continue
-
-                    for domain in os.listdir(template_dir):
-                        domain_dir = os.path.join(template_dir, domain)
-                        if not os.path.isdir(domain_dir):
-                            continue
-                        
-                        for instance in os.listdir(domain_dir):
-                            instance_dir = os.path.join(domain_dir, instance)
-                            if not os.path.isdir(instance_dir):
-                                continue
-
-                            for f in os.listdir(instance_dir):
-                                if f.endswith(".log"):
-                                    log_file = os.path.join(instance_dir, f)
-                                    try:
-                                        result = callback_fn(exp, model, template, domain, instance, log_file)
-                                        results.append(result)
-                                    except Exception as e:
-                                        if verbose:
-                                            print(f"Error processing {log_file}: {e}")
-                                        if not continue_on_error:
-                                            raise e
-        return results
+        if max_workers <= 1:
+            return list(iter_log_files(callback_fn, continue_on_error, verbose, **filters))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(iter_log_files(callback_fn, continue_on_error, verbose, executor=executor, max_pending=4 * max_workers, ordered=True, **filters))
     
 def sort_landmarks(task: Task, action_landmarks: list[str]) -> list[str]:
-    soln_path = task.get_solution_path(".pddl.soln")
-    if not os.path.exists(soln_path):
-        raise RuntimeError(f"Solution file not found for task {task}: {soln_path}")
-
-    with open(soln_path, 'r') as f:
-        soln = f.read()
-
-    def landmarks_value(landmark: str, soln: str) -> int:
-        if landmark in soln:
-            return soln.index(landmark)
-        else:
-            raise ValueError(f"Landmark {landmark} not found in solution.")
-    # Sort the action landmarks based on their order in the solution
-    sorted_landmarks = sorted(action_landmarks, key=lambda x: landmarks_value(x, soln))
-    return sorted_landmarks
\ No newline at end of file
+    """
+    Sorts action landmarks by their first appearance in the task's reference plan or, if the task has
+    none, by the natural orderings of its landmark graph.
+    """
+    from reasoning.ordering import order_landmarks
+    return order_landmarks(task, action_landmarks)
\ No newline at end of file
@@ -1,12 +1,133 @@
 import os
-from reasoning.utils import val, process_log_files
+from reasoning.utils import val, iter_log_files
+from reasoning.store import RESULTS_STORE
 import pandas as pd
-from reasoning.settings import PROMPT_FILE_NAME, VALIDATED_LOG_FILE_FILE_NAME, VALIDATION_FILE_NAME, EXPERIMENTS_DIR, ERROR_TYPES_FILE_NAME, BENCHMARKS_DIR, SOLUTIONS_DIR_NAME
+from reasoning.settings import PROMPT_FILE_NAME, VALIDATED_LOG_FILE_FILE_NAME, VALIDATION_FILE_NAME, EXPERIMENTS_DIR, ERROR_TYPES_FILE_NAME, BENCHMARKS_DIR, SOLUTIONS_DIR_NAME, VALIDATION_VERDICT_FILE_NAME, VAL_BINARY, VALIDATION_BACKEND, RESPONSE_SCAN_LIMIT, RESPONSE_MMAP_THRESHOLD, RESULTS_CHUNK_ROWS
 
 from reasoning.utils import extract
+from reasoning.tags import TaggedDocument, read_section
+from reasoning.pddl import simulate
 import re
+import threading
+import tempfile
+import hashlib
+import shutil
+import atexit
+import json
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
+import csv
 
-def validate_log_file(experiment : str, model : str, template : str, domain : str, instance : str, log_file : str ) -> None:
+# Scratch space for the files handed to VAL; tmpfs-backed when available
+SCRATCH_ROOT = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+_scratch_dir = None
+_scratch_lock = threading.Lock()
+_materialized_prompts : dict[tuple[str, int], tuple[str, str]] = {}
+
+# Version of the plan extraction and validation logic; bump it when verdicts change, so cached .val.json files are redone
+VALIDATOR_VERSION = "3"
+
+def get_scratch_dir() -> str:
+    """
+    Returns this process's private scratch directory, removed at exit.
+    """
+    global _scratch_dir
+    with _scratch_lock:
+        if _scratch_dir is None:
+            _scratch_dir = tempfile.mkdtemp(prefix="reasoning-val-", dir=SCRATCH_ROOT)
+            atexit.register(shutil.rmtree, _scratch_dir, ignore_errors=True)
+        return _scratch_dir
+
+def materialize_prompt(prompt_file: str) -> tuple[str, str]:
+    """
+    Writes the domain and instance of a prompt to the scratch directory once and returns their paths.
+
+    Every sample of an instance shares the same files; they are rewritten only if the prompt changes.
+    """
+    key = (prompt_file, os.stat(prompt_file).st_mtime_ns)
+    paths = _materialized_prompts.get(key)
+    if paths is not None:
+        return paths
+
+    with open(prompt_file, 'r') as f:
+        prompt = TaggedDocument(f.read(), until="instance-file")
+
+    try:
+        domain_content = prompt.extract("domain", return_str=True)
+    except ValueError as e:
+        raise ValueError(f"Domain extraction failed on file {prompt_file}: {e}")
+
+    try:
+        instance_content = prompt.extract("instance", return_str=True)
+    except ValueError as e:
+        raise ValueError(f"Instance extraction failed on file {prompt_file}: {e}")
+
+    paths = []
+    for content in (domain_content, instance_content):
+        path = os.path.join(get_scratch_dir(), hashlib.sha1(content.encode("utf-8")).hexdigest() + ".pddl")
+        if not os.path.exists(path):
+            # Write then rename so a concurrent job never reads a partial file
+            with tempfile.NamedTemporaryFile('w', dir=get_scratch_dir(), suffix=".tmp", delete=False) as f:
+                f.write(content)
+            os.replace(f.name, path)
+        paths.append(path)
+    _materialized_prompts[key] = tuple(paths)
+    return _materialized_prompts[key]
+
+@lru_cache(maxsize=None)
+def get_val_version() -> str:
+    if not os.path.exists(VAL_BINARY):
+        return "missing"
+    stat = os.stat(VAL_BINARY)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def fingerprint(*paths: str) -> str:
+    """
+    Fingerprint of the inputs of a validation: size and mtime of each file plus the validator and VAL binary versions.
+    """
+    parts = [VALIDATOR_VERSION, get_val_version()]
+    for path in paths:
+        stat = os.stat(path)
+        parts.append(f"{stat.st_size}-{stat.st_mtime_ns}")
+    return "/".join(parts)
+
+def run_validation(domain_file: str, instance_file: str, plan: list[str], val_file: str, backend: str) -> tuple[bool, str | None, bool | None]:
+    """
+    Validates a plan with the given backend and returns (valid, error, mismatch).
+
+    "val" runs the VAL binary, "native" the in-process simulator of reasoning.pddl (falling back to
+    VAL for unsupported PDDL), and "crosscheck" runs both, reports VAL's verdict and sets mismatch
+    when the two disagree.
+    """
+    native = None
+    if backend != "val":
+        try:
+            native = simulate(domain_file, instance_file, plan, val_file if backend == "native" else None)
+        except ValueError:
+            native = None
+        if backend == "native" and native is not None:
+            return native[0], native[1], None
+
+    with tempfile.NamedTemporaryFile('w', dir=get_scratch_dir(), suffix=".pddl", delete=False) as f:
+        f.write("\n".join(plan))
+    try:
+        valid, error = val(domain_file, instance_file, f.name, val_file)
+    finally:
+        os.remove(f.name)
+    if backend == "crosscheck" and native is not None:
+        return valid, error, native != (valid, error)
+    return valid, error, None
+
+def validate_log_file(experiment : str, model : str, template : str, domain : str, instance : str, log_file : str, incremental: bool = False, backend: str = VALIDATION_BACKEND) -> None:
+    """
+    Validates the plan of a sample log and returns the validation row.
+
+    With incremental, the verdict stored in sample_N.val.json is reused as long as the sample,
+    its prompt, the instance landmarks, the backend and the VAL binary are unchanged.
+    With the "crosscheck" backend, the row has an extra backend_mismatch column.
+    """
+    if backend not in ("val", "native", "crosscheck"):
+        raise ValueError(f"Unknown validation backend: {backend}")
     pattern = r"sample_(\d+).log"
     log_file_name = log_file.split("/")[-1].strip()
     if not re.match(pattern, log_file_name):
@@ -15,64 +136,54 @@ def validate_log_file(experiment : str, model : str, template : str, domain : st
     log_dir = os.path.dirname(log_file)
     prompt_file = os.path.join(log_dir, PROMPT_FILE_NAME)
     val_file = os.path.join(log_dir, VALIDATED_LOG_FILE_FILE_NAME.format(sample_id))
-    temp_domain_file = "temp_domain.pddl"
-    temp_instance_file = "temp_instance.pddl"
-    temp_plan_file = "temp_plan.pddl"
+    verdict_file = os.path.join(log_dir, VALIDATION_VERDICT_FILE_NAME.format(sample_id))
+    landmarks_file = os.path.join(BENCHMARKS_DIR, domain, SOLUTIONS_DIR_NAME, instance + ".pddl.lndmk")
 
     if not os.path.exists(prompt_file):
         raise FileNotFoundError(f"Prompt file {prompt_file} does not exist.")
-    
-    with open(prompt_file, 'r') as f:
-        prompt_content = f.read()
-
-    try:
-        domain_content = extract(prompt_content, "domain", return_str=True)
-    except ValueError as e:
-        raise ValueError(f"Domain extraction failed on file {prompt_file}: {e}")
+    if not os.path.exists(landmarks_file):
+        raise FileNotFoundError(f"Landmarks file {landmarks_file} does not exist.")
 
-    try:
-        instance_content = extract(prompt_content, "instance", return_str=True)
-    except ValueError as e:
-        raise ValueError(f"Instance extraction failed on file {prompt_file}: {e}")
+    row = {
+        "experiment": experiment,
+        "model": model,
+        "template": template,
+        "domain": domain,
+        "instance": instance,
+        "sample_id": sample_id,
+    }
+    sample_fingerprint = f"{backend}/" + fingerprint(log_file, prompt_file, landmarks_file)
+    if incremental and os.path.exists(verdict_file):
+        try:
+            with open(verdict_file, 'r') as f:
+                verdict = json.load(f)
+            if verdict["fingerprint"] == sample_fingerprint:
+                return {**row, **verdict["result"]}
+        except (ValueError, KeyError):
+            pass
 
-    with open(log_file, 'r') as f:
-        log_content = f.read()
+    domain_file, instance_file = materialize_prompt(prompt_file)
 
     plan = []
-    valid, error = False, None
+    valid, error, mismatch = False, None, None
     try:
-        response = extract(log_content, "response", return_str=True)
+        # Only the response slice of the log is read; a long <thought> written after it is never loaded
+        response = read_section(log_file, "response", RESPONSE_SCAN_LIMIT, RESPONSE_MMAP_THRESHOLD)
+        if response is None:
+            raise ValueError("Object response not found in the output.")
         try:
-            plan = extract(response, "plan")
-            with open(temp_domain_file, 'w') as f:
-                f.write(domain_content)
-            with open(temp_instance_file, 'w') as f:
-                f.write(instance_content)
-            with open(temp_plan_file, 'w') as f:
-                f.write("\n".join(plan))
-
+            plan = response.extract("plan")
+        except ValueError as e:
+            error = f"Plan extraction failed : {e}"
+        else:
             try:
-                valid, error = val(temp_domain_file, temp_instance_file, temp_plan_file, val_file)
-
+                valid, error, mismatch = run_validation(domain_file, instance_file, plan, val_file, backend)
             except RuntimeError as e:
                 raise RuntimeError(f"Validation failed: {e}")
-        except ValueError as e:
-            error = f"Plan extraction failed : {e}"
     except ValueError as e:
         error = f"Response extraction failed : {e}"
-    finally:
-        if os.path.exists(temp_domain_file):
-            os.remove(temp_domain_file)
-        if os.path.exists(temp_instance_file):
-            os.remove(temp_instance_file)
-        if os.path.exists(temp_plan_file):
-            os.remove(temp_plan_file)
 
     metadata = {}
-    landmarks_file = os.path.join(BENCHMARKS_DIR, domain, SOLUTIONS_DIR_NAME, instance + ".pddl.lndmk")
-    if not os.path.exists(landmarks_file):
-        raise FileNotFoundError(f"Landmarks file {landmarks_file} does not exist.")
-
     with open(landmarks_file) as f:
         content = f.read()
     action_landmarks = set(extract(content, "landmark"))
@@ -82,17 +193,17 @@ def validate_log_file(experiment : str, model : str, template : str, domain : st
         "num_action_landmarks_used": len(used_action_landmarks)
     })
 
-    return {
-        "experiment": experiment,
-        "model": model,
-        "template": template,
-        "domain": domain,
-        "instance": instance,
-        "sample_id": sample_id,
+    result = {
         "valid": valid,
         "error": error,
         **metadata
     }
+    if backend == "crosscheck":
+        result["backend_mismatch"] = bool(mismatch)
+    with open(verdict_file, 'w') as f:
+        json.dump({"fingerprint": sample_fingerprint, "result": result}, f)
+
+    return {**row, **result}
 
 
 def analyze_error_type(df: pd.DataFrame, experiment_path):
@@ -132,18 +243,110 @@ def analyze_error_type(df: pd.DataFrame, experiment_path):
     print(f"Validation error analysis saved to {output_file}")
 
 
-data = process_log_files(callback_fn=validate_log_file, continue_on_error=True, verbose=False)
+VALIDATION_COLUMNS = [
+    "experiment", "model", "template", "domain", "instance", "sample_id",
+    "valid", "error", "num_action_landmarks", "num_action_landmarks_used",
+]
+
+def _in_scope(row: dict, filters: dict) -> bool:
+    """
+    Whether a validation row falls under the model/template/domain filters of a validation run.
+    """
+    for column in ("model", "template", "domain"):
+        value = filters.get(column)
+        if value is None:
+            continue
+        if str(row.get(column)) not in ({value} if isinstance(value, str) else set(value)):
+            return False
+    return True
+
+def _merge_previous_rows(path: str, writer, columns: list[str], count: int, filters: dict) -> int:
+    """
+    Copies the rows of an experiment's previous validation file that a filtered run did not cover.
 
-response_df = pd.DataFrame(data)
+    Returns the number of rows written so far.
+    """
+    if not os.path.exists(path):
+        return count
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return count
+        for values in reader:
+            row = dict(zip(header[1:], values[1:]))
+            if _in_scope(row, filters):
+                continue
+            writer.writerow([count] + [row.get(column, "") for column in columns])
+            count += 1
+    return count
 
-if not response_df.empty:
-    for experiment in os.listdir(EXPERIMENTS_DIR):
+def validate_experiments(workers: int = 1, backend: str = VALIDATION_BACKEND, **filters) -> list[str]:
+    """
+    Validates the experiments matching filters and streams the rows into each experiment's validation file.
+
+    Rows are written in traversal order as soon as every earlier row is done; each file is moved into place once
+    its experiment is done. Rows are also appended to the validation table of the results store in
+    chunks of RESULTS_CHUNK_ROWS; the store partitions the run covered are then replaced by the new
+    rows, so samples whose logs were deleted disappear from both the file and the store.
+    With model, template or domain filters, the rows of the previous file outside the filters are kept.
+    Returns the paths of the experiments that produced rows.
+    """
+    columns = VALIDATION_COLUMNS + (["backend_mismatch"] if backend == "crosscheck" else [])
+    writers = {}
+    chunks = {}
+    previous_parts = {}
+    # Only samples whose inputs changed since their last validation are re-validated
+    callback_fn = partial(validate_log_file, incremental=True, backend=backend)
+    workers = max(1, workers)
+    # VAL runs in a subprocess, so threads are enough to keep every core busy
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            # Ordered, so the validation file lists samples in traversal order whatever the timing of the workers
+            for row in iter_log_files(callback_fn, continue_on_error=True, verbose=False, executor=executor, max_pending=4 * workers, ordered=True, **filters):
+                experiment = row["experiment"]
+                if experiment not in writers:
+                    path = os.path.join(EXPERIMENTS_DIR, experiment, VALIDATION_FILE_NAME)
+                    f = open(path + ".tmp", 'w', newline='')
+                    writer = csv.writer(f, lineterminator="\n")
+                    # Same layout as DataFrame.to_csv with its index
+                    writer.writerow([""] + columns)
+                    writers[experiment] = [f, writer, 0]
+                    previous_parts[experiment] = RESULTS_STORE.part_files("validation", **{**filters, "experiment": experiment})
+                f, writer, count = writers[experiment]
+                writer.writerow([count] + [row.get(column) for column in columns])
+                writers[experiment][2] += 1
+                chunk = chunks.setdefault(experiment, [])
+                chunk.append(row)
+                if len(chunk) >= RESULTS_CHUNK_ROWS:
+                    RESULTS_STORE.append("validation", pd.DataFrame(chunk, columns=columns))
+                    chunk.clear()
+            for experiment, (f, writer, count) in writers.items():
+                path = os.path.join(EXPERIMENTS_DIR, experiment, VALIDATION_FILE_NAME)
+                writers[experiment][2] = _merge_previous_rows(path, writer, columns, count, filters)
+        finally:
+            for f, _, _ in writers.values():
+                f.close()
+
+    for experiment, chunk in chunks.items():
+        if chunk:
+            RESULTS_STORE.append("validation", pd.DataFrame(chunk, columns=columns))
+        # The covered partitions were rewritten in full, so their previous parts are dropped
+        RESULTS_STORE.remove(previous_parts[experiment])
+        RESULTS_STORE.compact("validation", experiment=experiment)
+
+    experiment_dirs = []
+    for experiment in sorted(writers):
         experiment_dir = os.path.join(EXPERIMENTS_DIR, experiment)
-        if not os.path.isdir(experiment_dir): continue 
-
-        exp_df = response_df[response_df["experiment"] == experiment].copy()
-        if not exp_df.empty:
-            exp_df.reset_index(drop=True, inplace=True)
-            exp_df.to_csv(os.path.join(experiment_dir, VALIDATION_FILE_NAME))
-            print(f"Validation results saved to {os.path.join(experiment_dir, VALIDATION_FILE_NAME)}")
-            analyze_error_type(exp_df, experiment_dir)
\ No newline at end of file
+        path = os.path.join(experiment_dir, VALIDATION_FILE_NAME)
+        os.replace(path + ".tmp", path)
+        print(f"Validation results saved to {path}")
+        experiment_dirs.append(experiment_dir)
+    return experiment_dirs
+
+
+if __name__ == "__main__":
+    workers = os.cpu_count() or 1
+    for experiment_dir in validate_experiments(workers=workers):
+        exp_df = pd.read_csv(os.path.join(experiment_dir, VALIDATION_FILE_NAME), index_col=0)
+        analyze_error_type(exp_df, experiment_dir)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import reasoning.aggregator as aggregator
+import reasoning.metrics as metrics
+from reasoning.settings import VALIDATION_FILE_NAME
+from reasoning.store import ResultsStore
+
+def make_validation_results(experiment: str, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for domain in ["logistics", "blocksworld"]:
+        for template in ["pddl", "delete_relaxed_plan"]:
+            # Instance names whose insertion order differs from their sorted order
+            for instance in ["p9", "p10", "p2", "p11", "p1"]:
+                for sample_id in range(1, 4):
+                    num_landmarks = int(rng.integers(1, 20))
+                    rows.append({
+                        "experiment": experiment,
+                        "model": "model",
+                        "template": template,
+                        "domain": domain,
+                        "instance": instance,
+                        "sample_id": sample_id,
+                        "valid": bool(rng.random() < 0.4),
+                        "error": None,
+                        "num_action_landmarks": num_landmarks,
+                        "num_action_landmarks_used": int(rng.integers(0, num_landmarks + 1)),
+                    })
+    return pd.DataFrame(rows)
+
+@pytest.fixture
+def experiment_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "RESULTS_STORE", ResultsStore(str(tmp_path / "results")))
+    monkeypatch.setattr(aggregator, "CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "experiments" / "exp"
+    path.mkdir(parents=True)
+    make_validation_results("exp").to_csv(path / VALIDATION_FILE_NAME)
+    return str(path)
+
+def test_incremental_pass_at_k_matches_full_recompute(experiment_path):
+    expected = metrics.compute_pass_at_k(experiment_path)
+
+    metrics_aggregator = aggregator.MetricsAggregator(experiment_path)
+    df = metrics.load_validation_results(experiment_path, aggregator.VALIDATION_COLUMNS)
+    # Fold the rows in two batches, the second one in reverse order, like successive validation runs
+    metrics_aggregator.update(df.iloc[:30])
+    metrics_aggregator.update(df.iloc[30:].iloc[::-1])
+    actual = metrics_aggregator._pass_at_k(set(metrics_aggregator.state["samples"]))
+
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
+
+def test_update_reports_only_changed_groups(experiment_path):
+    metrics_aggregator = aggregator.MetricsAggregator(experiment_path)
+    df = metrics.load_validation_results(experiment_path, aggregator.VALIDATION_COLUMNS)
+    metrics_aggregator.update(df, complete=True)
+
+    changed_row = df.index[(df["domain"] == "logistics") & (df["template"] == "pddl")][0]
+    df.loc[changed_row, "valid"] = not df.loc[changed_row, "valid"]
+    assert metrics_aggregator.update(df, complete=True) == {"exp|logistics|model|pddl"}
@@ -0,0 +1,54 @@
+import pytest
+
+from reasoning.cache import ResponseCache, normalize_generation_config, response_key
+
+RESPONSE = {"response": "(pickup b1)", "metadata": {"num_requests": 1}}
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    yield cache
+    cache.close()
+
+def test_key_ignores_retry_parameters_and_key_order():
+    config = {"temperature": 1.0, "top_k": 64, "wait_time": 40}
+    assert normalize_generation_config(config) == '{"temperature":1.0,"top_k":64}'
+    assert response_key("model", config, "prompt", 1) == response_key("model", {"top_k": 64, "temperature": 1.0}, "prompt", 1)
+
+@pytest.mark.parametrize("model, config, prompt, sample_id", [
+    ("other", {"temperature": 1.0}, "prompt", 1),
+    ("model", {"temperature": 0.5}, "prompt", 1),
+    ("model", {"temperature": 1.0}, "other prompt", 1),
+    ("model", {"temperature": 1.0}, "prompt", 2),
+])
+def test_key_depends_on_everything_else(model, config, prompt, sample_id):
+    assert response_key(model, config, prompt, sample_id) != response_key("model", {"temperature": 1.0}, "prompt", 1)
+
+def test_put_and_get(cache):
+    assert cache.get("model", {"temperature": 1.0}, "prompt", 1) is None
+    cache.put("model", {"temperature": 1.0, "wait_time": 10}, "prompt", 1, RESPONSE)
+    assert cache.get("model", {"temperature": 1.0, "wait_time": 40}, "prompt", 1) == RESPONSE
+    assert cache.get("model", {"temperature": 1.0}, "prompt", 2) is None
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    cache = ResponseCache(path)
+    cache.put("model", {}, "prompt", 1, RESPONSE)
+    cache.close()
+    cache = ResponseCache(path)
+    assert cache.get("model", {}, "prompt", 1) == RESPONSE
+    cache.close()
+
+def test_lru_eviction_by_size(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr("reasoning.cache.time.time", lambda: float(next(clock)))
+    size = len('{"response": "' + "x" * 100 + '", "metadata": {}}')
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_bytes=3 * size)
+    for sample_id in (1, 2, 3):
+        cache.put("model", {}, "prompt", sample_id, {"response": "x" * 100, "metadata": {}})
+    # Reading sample 1 makes sample 2 the least recently used
+    assert cache.get("model", {}, "prompt", 1) is not None
+    cache.put("model", {}, "prompt", 4, {"response": "x" * 100, "metadata": {}})
+    assert cache.get("model", {}, "prompt", 2) is None
+    assert all(cache.get("model", {}, "prompt", sample_id) is not None for sample_id in (1, 3, 4))
+    cache.close()
@@ -0,0 +1,40 @@
+import os
+import shutil
+
+import pytest
+
+from reasoning import settings
+from reasoning.catalog import BenchmarkCatalog
+
+BLOCKSWORLD_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "benchmarks", "blocksworld")
+
+@pytest.fixture
+def benchmarks_dir(tmp_path, monkeypatch):
+    domain_dir = tmp_path / "blocksworld"
+    shutil.copytree(os.path.join(BLOCKSWORLD_DIR, "instances", "4-blocks"), domain_dir / "instances" / "4-blocks")
+    shutil.copy(os.path.join(BLOCKSWORLD_DIR, "domain.pddl"), domain_dir)
+    monkeypatch.setattr(settings, "BENCHMARKS_DIR", str(tmp_path))
+    return domain_dir
+
+@pytest.mark.parametrize("n", [0, None])
+def test_last_without_a_limit_returns_every_entry(benchmarks_dir, n):
+    catalog = BenchmarkCatalog("blocksworld")
+    assert catalog.last(n) == catalog.select()
+    assert len(catalog.last(n)) == len(os.listdir(benchmarks_dir / "instances" / "4-blocks"))
+
+def test_last(benchmarks_dir):
+    catalog = BenchmarkCatalog("blocksworld")
+    ids = [entry.id for entry in catalog.select()]
+    assert [entry.id for entry in catalog.last(2)] == ids[-2:]
+    assert catalog.last(100) == catalog.select()
+
+def test_in_place_edit_is_detected(benchmarks_dir):
+    catalog = BenchmarkCatalog("blocksworld")
+    instance_dir = benchmarks_dir / "instances" / "4-blocks"
+    entry = catalog.select()[0]
+    dir_mtime = os.stat(instance_dir).st_mtime_ns
+    with open(entry.path, 'a') as f:
+        f.write("\n; edited\n")
+    os.utime(instance_dir, ns=(dir_mtime, dir_mtime))
+    reloaded = BenchmarkCatalog("blocksworld")
+    assert {e.path: e.size for e in reloaded.entries}[entry.path] == os.stat(entry.path).st_size
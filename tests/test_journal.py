@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from reasoning.journal import MetadataJournal, drop_partial_line, read_journal
+
+def write_lines(path, *lines: str) -> None:
+    path.write_text("".join(lines))
+
+def test_read_journal_skips_torn_and_corrupt_lines(tmp_path):
+    path = tmp_path / "metadata.jsonl"
+    write_lines(path, '{"sample_id": 1}\n', 'not json\n', '{"sample_id": 2}\n', '{"sample_id": 3')
+    assert list(read_journal(str(path))) == [{"sample_id": 1}, {"sample_id": 2}]
+    assert list(read_journal(str(tmp_path / "missing.jsonl"))) == []
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 64 * 1024])
+def test_drop_partial_line(tmp_path, chunk_size):
+    path = tmp_path / "metadata.jsonl"
+    write_lines(path, '{"sample_id": 1}\n', '{"sample_id": 2}\n', '{"sample_')
+    drop_partial_line(str(path), chunk_size)
+    assert path.read_text() == '{"sample_id": 1}\n{"sample_id": 2}\n'
+    drop_partial_line(str(path), chunk_size)
+    assert path.read_text() == '{"sample_id": 1}\n{"sample_id": 2}\n'
+
+def test_drop_partial_line_without_newline(tmp_path):
+    path = tmp_path / "metadata.jsonl"
+    write_lines(path, '{"sample_id": 1')
+    drop_partial_line(str(path))
+    assert path.read_text() == ""
+    drop_partial_line(str(tmp_path / "missing.jsonl"))
+
+def test_append_after_a_crash(tmp_path):
+    path = tmp_path / "metadata.jsonl"
+    write_lines(path, '{"sample_id": 1}\n', '{"sample_id": 2, "tok')
+    with MetadataJournal(str(path)) as journal:
+        journal.append({"sample_id": 3})
+        assert journal.records() == [{"sample_id": 1}, {"sample_id": 3}]
+    assert journal.file.closed
+    assert [json.loads(line) for line in path.read_text().splitlines()] == [{"sample_id": 1}, {"sample_id": 3}]
+
+def test_truncate(tmp_path):
+    path = tmp_path / "metadata.jsonl"
+    with MetadataJournal(str(path), fsync_every=1) as journal:
+        journal.append({"sample_id": 1})
+        journal.truncate()
+        journal.append({"sample_id": 2})
+        assert journal.records() == [{"sample_id": 2}]
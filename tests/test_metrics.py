@@ -0,0 +1,32 @@
+import numpy as np
+
+from reasoning.metrics import bootstrap_ci, pass_at_k, pass_at_k_matrix
+
+def test_pass_at_k_matrix_matches_scalar():
+    max_k = 60
+    pairs = [(n, c) for n in range(60) for c in range(n + 1)]
+    n, c = np.array(pairs).T
+    matrix = pass_at_k_matrix(n, c, max_k)
+    expected = np.array([[pass_at_k(n_i, c_i, k) for k in range(1, max_k + 1)] for n_i, c_i in pairs])
+    np.testing.assert_allclose(matrix, expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+def test_pass_at_k_matrix_large_counts_stay_finite():
+    matrix = pass_at_k_matrix(np.array([5000]), np.array([1]), 10)
+    assert np.all(np.isfinite(matrix))
+    np.testing.assert_allclose(matrix[0], np.arange(1, 11) / 5000)
+
+def test_bootstrap_ci_is_deterministic_with_a_seed():
+    values = np.random.default_rng(0).random((40, 3))
+    first = bootstrap_ci(values, n_bootstrap=500, rng=np.random.default_rng(42))
+    second = bootstrap_ci(values, n_bootstrap=500, rng=np.random.default_rng(42))
+    np.testing.assert_array_equal(first[0], second[0])
+    np.testing.assert_array_equal(first[1], second[1])
+    other = bootstrap_ci(values, n_bootstrap=500, rng=np.random.default_rng(43))
+    assert not np.array_equal(first[0], other[0])
+
+def test_bootstrap_ci_brackets_the_mean():
+    values = np.random.default_rng(1).random((100, 2))
+    low, high = bootstrap_ci(values, n_bootstrap=2000, rng=np.random.default_rng(0))
+    mean = values.mean(axis=0)
+    assert np.all(low <= mean) and np.all(mean <= high)
+    assert np.all(high - low < 0.2)
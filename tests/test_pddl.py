@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from reasoning.pddl import load_simulator, simulate
+
+BLOCKSWORLD_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "benchmarks", "blocksworld")
+DOMAIN = os.path.join(BLOCKSWORLD_DIR, "domain.pddl")
+# 4 blocks: b2 on b1, b3 on b4; goal (on b1 b2) (on b4 b1)
+INSTANCE = os.path.join(BLOCKSWORLD_DIR, "instances", "4-blocks", "p01.pddl")
+
+VALID_PLAN = [
+    "(unstack b2 b1)",
+    "(putdown b2)",
+    "(unstack b3 b4)",
+    "(putdown b3)",
+    "(pickup b1)",
+    "(stack b1 b2)",
+    "(pickup b4)",
+    "(stack b4 b1)",
+]
+
+def test_valid_plan():
+    assert simulate(DOMAIN, INSTANCE, VALID_PLAN) == (True, None)
+
+def test_valid_plan_ignores_comments_and_step_prefixes():
+    plan = ["; reference plan"] + [f"{step}: {action} ; step {step}" for step, action in enumerate(VALID_PLAN)]
+    assert simulate(DOMAIN, INSTANCE, plan) == (True, None)
+
+def test_bad_operator():
+    assert simulate(DOMAIN, INSTANCE, ["(unstack b2 b1)", "(drop b2)"]) == (False, "Error: Bad operator in plan.")
+
+def test_unknown_object_is_a_bad_operator():
+    assert simulate(DOMAIN, INSTANCE, ["(unstack b2 b9)"]) == (False, "Error: Bad operator in plan.")
+
+def test_wrong_arity():
+    assert simulate(DOMAIN, INSTANCE, ["(unstack b2 b1)", "(stack b2 b3 b4)"]) == (False, "Error: Bad operator in plan.")
+
+def test_failed_precondition():
+    # b1 is under b2, so it cannot be picked up
+    assert simulate(DOMAIN, INSTANCE, ["(pickup b1)"]) == (False, "Error: Plan failed to execute.")
+
+def test_unmet_goal():
+    assert simulate(DOMAIN, INSTANCE, VALID_PLAN[:-2]) == (False, "Error: Goal not satisfied.")
+
+def test_report_is_saved(tmp_path):
+    save_path = tmp_path / "sample_1.val"
+    simulate(DOMAIN, INSTANCE, VALID_PLAN, str(save_path))
+    report = save_path.read_text()
+    assert "Plan executed successfully - checking goal" in report and "Plan valid" in report
+
+def test_bad_operator_is_reported_before_execution():
+    # Step 1 fails to execute (b1 is not clear), step 3 names no operator of the domain
+    plan = ["(pickup b1)", "(putdown b1)", "(teleport b1 b2)"]
+    valid, error, report = load_simulator(DOMAIN, INSTANCE).simulate(plan)
+    assert not valid
+    assert error == "Error: Bad operator in plan."
+    assert report == ["Bad operator in plan! Step 3: (teleport b1 b2)"]
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from reasoning.pddl import load_grounded_task
+from reasoning.relaxation import compute_action_landmarks, compute_delete_relaxed_plan
+from reasoning.utils import extract
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "benchmarks")
+# The smallest instance of every benchmark domain, with the landmarks pyperplan stored for it
+TASKS = [
+    ("blocksworld", "4-blocks/p01"),
+    ("logistics", "3-packages/p01"),
+    ("miconic", "4-passenger/p01"),
+    ("spanner", "4-spanners/p01"),
+    ("minigrid", "1-shape/p01"),
+]
+
+def task_paths(domain: str, instance: str) -> tuple[str, str]:
+    domain_dir = os.path.join(BENCHMARKS_DIR, domain)
+    return os.path.join(domain_dir, "domain.pddl"), os.path.join(domain_dir, "instances", instance + ".pddl")
+
+def stored_artifact(domain: str, instance: str, extension: str) -> str:
+    path = os.path.join(BENCHMARKS_DIR, domain, "solutions", os.path.basename(instance) + extension)
+    with open(path, 'r') as f:
+        return f.read()
+
+@pytest.mark.parametrize("domain, instance", TASKS)
+def test_action_landmarks_match_pyperplan(domain, instance):
+    expected = set(extract(stored_artifact(domain, instance, ".pddl.lndmk"), "landmark"))
+    assert set(compute_action_landmarks(*task_paths(domain, instance))) == expected
+
+@pytest.mark.parametrize("domain, instance", TASKS)
+def test_delete_relaxed_plan_is_a_relaxed_plan(domain, instance):
+    domain_path, instance_path = task_paths(domain, instance)
+    plan = compute_delete_relaxed_plan(domain_path, instance_path)
+    task = load_grounded_task(domain_path, instance_path)
+    operator_index = {name: i for i, name in enumerate(task.operators)}
+    # Executable in order when delete effects are ignored, and reaching the goals
+    state = set(task.initial_state)
+    for name in plan:
+        op = operator_index[name]
+        assert set(task.preconditions[op]) <= state, f"{name} is not applicable"
+        state |= set(task.add_effects[op])
+    assert set(task.goals) <= state
+    assert len(set(plan)) == len(plan)
+    assert set(compute_action_landmarks(domain_path, instance_path)) <= set(plan)
+    # Same length as the relaxed plan pyperplan stored (hff with preferred operators)
+    assert len(plan) == len(extract(stored_artifact(domain, instance, ".pddl.soln.rlx"), "delete_relaxed_plan"))
+
+def test_delete_relaxed_plan_blocksworld():
+    plan = compute_delete_relaxed_plan(*task_paths("blocksworld", "4-blocks/p01"))
+    assert plan == ["(unstack b2 b1)", "(unstack b3 b4)", "(pickup b1)", "(pickup b4)", "(stack b1 b2)", "(stack b4 b1)"]
@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+import pytest
+
+from reasoning.store import ResultsStore
+
+def validation_rows(experiment: str, template: str, valid: bool, instances=("p01", "p02")) -> pd.DataFrame:
+    return pd.DataFrame([
+        {
+            "experiment": experiment,
+            "model": "model",
+            "template": template,
+            "domain": "blocksworld",
+            "instance": instance,
+            "sample_id": sample_id,
+            "valid": valid,
+            "error": None if valid else "Error: Goal not satisfied.",
+            "num_action_landmarks": 6,
+            "num_action_landmarks_used": 4,
+        }
+        for instance in instances for sample_id in (1, 2)
+    ])
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultsStore(str(tmp_path / "results"))
+
+def test_append_and_read(store):
+    touched = store.append("validation", validation_rows("exp", "ordered_landmarks_feasible[first_appearance]", True))
+    assert touched == [("exp", "model", "ordered_landmarks_feasible[first_appearance]", "blocksworld")]
+    df = store.read("validation", experiment="exp")
+    assert len(df) == 4
+    assert df["template"].unique().tolist() == ["ordered_landmarks_feasible[first_appearance]"]
+    assert df["valid"].all()
+    assert store.read("validation", columns=["instance", "valid"], template="pddl").empty
+
+def test_append_requires_partition_columns(store):
+    with pytest.raises(ValueError, match="partition columns"):
+        store.append("validation", validation_rows("exp", "pddl", True).drop(columns=["domain"]))
+    with pytest.raises(ValueError, match="Unknown table"):
+        store.append("results", validation_rows("exp", "pddl", True))
+
+def test_read_keeps_the_latest_row_per_key(store):
+    store.append("validation", validation_rows("exp", "pddl", True))
+    store.append("validation", validation_rows("exp", "pddl", False, instances=("p02",)))
+    df = store.read("validation", columns=["instance", "sample_id", "valid"]).sort_values(["instance", "sample_id"])
+    assert df["valid"].tolist() == [True, True, False, False]
+
+def test_compact_merges_parts(store):
+    store.append("validation", validation_rows("exp", "pddl", True))
+    store.append("validation", validation_rows("exp", "pddl", False, instances=("p02",)))
+    before = store.read("validation").sort_values(["instance", "sample_id"], ignore_index=True)
+    assert len(store.part_files("validation")) == 2
+    store.compact("validation", experiment="exp")
+    parts = store.part_files("validation")
+    assert len(parts) == 1 and not os.path.exists(parts[0] + ".tmp")
+    after = store.read("validation").sort_values(["instance", "sample_id"], ignore_index=True)
+    pd.testing.assert_frame_equal(before, after)
+
+def test_remove_covered_partitions(store):
+    store.append("validation", validation_rows("exp", "pddl", True))
+    store.append("validation", validation_rows("other", "pddl", True))
+    # A full rewrite of exp: its previous parts are superseded, so dropped rows disappear
+    previous = store.part_files("validation", experiment="exp")
+    store.append("validation", validation_rows("exp", "pddl", False, instances=("p01",)))
+    store.remove(previous)
+    store.remove(previous)
+    df = store.read("validation", experiment="exp")
+    assert df["instance"].tolist() == ["p01", "p01"] and not df["valid"].any()
+    assert len(store.read("validation", experiment="other")) == 4
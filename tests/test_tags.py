@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+from reasoning.tags import TaggedDocument, read_section
+
+# A recorded response that drafts a plan and then restarts it in a second <plan> section
+RECORDED_LOG = os.path.join(os.path.dirname(__file__), "..", "data", "experiments", "3-samples", "gemini-thinking",
+                            "ordered_landmarks_exact", "logistics", "p42", "sample_3.log")
+
+RESPONSE = """<response>
+Draft:
+<plan>
+(pickup b1)
+</plan>
+Fixed:
+<plan>
+(unstack b2 b1)
+(putdown b2)
+</plan>
+</response>
+"""
+
+def test_last_plan_wins():
+    document = TaggedDocument(RESPONSE)
+    assert len(document.spans("plan")) == 2
+    assert document.extract("plan") == ["(unstack b2 b1)", "(putdown b2)"]
+    assert document.extract("plan", return_str=True) == "(unstack b2 b1)\n(putdown b2)"
+
+def test_first_occurrence_of_other_objects():
+    document = TaggedDocument("<metadata>\nfirst\n</metadata>\n<metadata>\nsecond\n</metadata>")
+    assert document.extract("metadata") == ["first"]
+
+def test_bytes_document_matches_str():
+    document = TaggedDocument(RESPONSE.encode("utf-8"))
+    assert document.extract("plan") == TaggedDocument(RESPONSE).extract("plan")
+
+def test_missing_close_tag():
+    document = TaggedDocument("<response>\n<plan>\n(pickup b1)\n</response>")
+    assert "plan" not in document
+    assert document.section("plan") is None
+    with pytest.raises(ValueError, match="not found"):
+        document.extract("plan")
+    assert document.section("response") == "\n<plan>\n(pickup b1)\n"
+
+def test_unknown_object():
+    with pytest.raises(ValueError, match="Unknown object type"):
+        TaggedDocument(RESPONSE).extract("answer")
+
+def test_until_stops_the_scan():
+    content = "<prompt>\n<domain-file>\nd\n</domain-file>\n<instance-file>\ni\n</instance-file>\n<plan>\n(a)\n</plan>\n</prompt>"
+    document = TaggedDocument(content, until="instance-file")
+    assert document.extract("domain") == ["d"]
+    assert document.extract("instance") == ["i"]
+    assert "plan" not in document
+    assert "plan" in TaggedDocument(content)
+
+def test_subdocument():
+    document = TaggedDocument("<plan>\n(outside)\n</plan>\n" + RESPONSE)
+    response = document.subdocument("response")
+    assert response.extract("plan") == ["(unstack b2 b1)", "(putdown b2)"]
+    assert len(response.spans("plan")) == 2
+    assert document.subdocument("thought") is None
+
+def test_recorded_log_with_two_plans():
+    with open(RECORDED_LOG, 'r') as f:
+        content = f.read()
+    last_plan = content.split("</plan><plan>", 1)[1].split("</plan>", 1)[0]
+    expected = [line.strip() for line in last_plan.splitlines() if line.strip()]
+    response = read_section(RECORDED_LOG, "response")
+    assert len(response.spans("plan")) == 2
+    assert response.extract("plan") == expected
+    assert TaggedDocument(content).extract("plan") == expected
+
+@pytest.mark.parametrize("mmap_threshold", [0, 1 << 30])
+def test_read_section_scan_limit(tmp_path, mmap_threshold):
+    path = tmp_path / "sample_1.log"
+    header = "[log] Generating response for sample 1.\n"
+    path.write_text(header + RESPONSE + "<thought>\n" + "x" * 1000 + "\n</thought>\n")
+    limit = len(header) + len("<response>")
+    response = read_section(str(path), "response", limit, mmap_threshold)
+    assert response.extract("plan") == ["(unstack b2 b1)", "(putdown b2)"]
+    # The close tag may lie past the scan limit, the open tag may not
+    assert read_section(str(path), "response", limit - 1, mmap_threshold) is None
+    assert read_section(str(path), "thought", len(header) + len(RESPONSE), mmap_threshold) is None
+    assert read_section(str(path), "thought", None, mmap_threshold) is not None
+
+def test_read_section_settings(tmp_path):
+    from reasoning.settings import RESPONSE_MMAP_THRESHOLD, RESPONSE_SCAN_LIMIT
+    path = tmp_path / "sample_1.log"
+    path.write_text("x" * (RESPONSE_SCAN_LIMIT - len("<response>") + 1) + RESPONSE)
+    assert read_section(str(path), "response", RESPONSE_SCAN_LIMIT, RESPONSE_MMAP_THRESHOLD) is None
+    path.write_text("x" * (RESPONSE_SCAN_LIMIT - len("<response>")) + RESPONSE + "y" * RESPONSE_MMAP_THRESHOLD)
+    assert read_section(str(path), "response", RESPONSE_SCAN_LIMIT, RESPONSE_MMAP_THRESHOLD).extract("plan") == ["(unstack b2 b1)", "(putdown b2)"]
+
+def test_read_section_missing(tmp_path):
+    path = tmp_path / "sample_1.log"
+    path.write_text("")
+    assert read_section(str(path), "response") is None
+    path.write_text("<response>\n(unterminated)\n")
+    assert read_section(str(path), "response") is None
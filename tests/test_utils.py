@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import reasoning.utils as utils
+
+class Record:
+    def __init__(self, instance: str):
+        self.experiment, self.model, self.template, self.domain = "exp", "model", "pddl", "blocksworld"
+        self.instance = instance
+        self.path = f"{instance}/sample_1.log"
+
+class FakeIndex:
+    def __init__(self, root):
+        pass
+
+    def records(self, **filters):
+        return [Record(f"p{i:02d}") for i in range(12)]
+
+@pytest.fixture(autouse=True)
+def fake_index(monkeypatch):
+    monkeypatch.setattr(utils, "ExperimentIndex", FakeIndex)
+
+def slow_first(release: threading.Event):
+    def callback(experiment, model, template, domain, instance, log_file):
+        if instance == "p00":
+            # Held until every other file is done, which would deadlock a strictly in-order window
+            assert release.wait(5)
+        elif instance == "p05":
+            raise ValueError("broken log")
+        return instance
+    return callback
+
+def test_results_are_yielded_as_they_complete():
+    release = threading.Event()
+    results = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for result in utils.iter_log_files(slow_first(release), verbose=False, executor=executor, max_pending=2):
+            results.append(result)
+            if len(results) == 10:
+                release.set()
+    assert results[-1] == "p00"
+    assert sorted(results) == [f"p{i:02d}" for i in range(12) if i != 5]
+
+def test_ordered_results_follow_traversal_order():
+    release = threading.Event()
+    callback = slow_first(release)
+    timer = threading.Timer(0.2, release.set)
+    timer.start()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(utils.iter_log_files(callback, verbose=False, executor=executor, max_pending=2, ordered=True))
+    timer.cancel()
+    assert results == [f"p{i:02d}" for i in range(12) if i != 5]
+
+def test_errors_propagate_without_continue_on_error():
+    release = threading.Event()
+    release.set()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        with pytest.raises(ValueError, match="broken log"):
+            list(utils.iter_log_files(slow_first(release), continue_on_error=False, verbose=False, executor=executor, max_pending=2))
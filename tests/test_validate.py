@@ -0,0 +1,41 @@
+import os
+import subprocess
+
+import pytest
+
+import reasoning.utils as utils
+import reasoning.validate as validate
+from reasoning.validate import run_validation
+
+BLOCKSWORLD_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "benchmarks", "blocksworld")
+DOMAIN = os.path.join(BLOCKSWORLD_DIR, "domain.pddl")
+INSTANCE = os.path.join(BLOCKSWORLD_DIR, "instances", "4-blocks", "p01.pddl")
+
+@pytest.mark.parametrize("stdout, stderr, expected", [
+    ("Plan executed successfully - checking goal\nPlan valid\n", "", (True, None)),
+    ("", "Error: Bad operator in plan!\n", (False, "Error: Bad operator in plan.")),
+    ("", "Error: Error in type-checking!\n", (False, "Error: Error in type-checking.")),
+    ("Plan failed because of unsatisfied precondition in:\nPlan failed to execute\n", "", (False, "Error: Plan failed to execute.")),
+    ("Bad plan description!\n", "", (False, "Error: Bad plan description.")),
+    ("Plan executed successfully - checking goal\nGoal not satisfied\nPlan invalid\n", "", (False, "Error: Goal not satisfied.")),
+    ("", "", (False, "Error: Unknown validation result.")),
+])
+def test_val_categories(monkeypatch, tmp_path, stdout, stderr, expected):
+    monkeypatch.setattr(utils.subprocess, "run", lambda command, **kwargs: subprocess.CompletedProcess(command, 0, stdout, stderr))
+    save_path = tmp_path / "sample_1.val"
+    assert utils.val(DOMAIN, INSTANCE, "plan.pddl", str(save_path)) == expected
+    assert save_path.read_text() == stdout
+
+def test_native_backend_does_not_run_val(monkeypatch, tmp_path):
+    monkeypatch.setattr(validate, "val", pytest.fail)
+    plan = ["(pickup b1)"]
+    assert run_validation(DOMAIN, INSTANCE, plan, str(tmp_path / "sample_1.val"), "native") == (False, "Error: Plan failed to execute.", None)
+
+@pytest.mark.parametrize("val_verdict, mismatch", [
+    ((False, "Error: Plan failed to execute."), False),
+    ((False, "Error: Goal not satisfied."), True),
+])
+def test_crosscheck_reports_val_verdict_and_mismatch(monkeypatch, tmp_path, val_verdict, mismatch):
+    monkeypatch.setattr(validate, "val", lambda *args: val_verdict)
+    plan = ["(pickup b1)"]
+    assert run_validation(DOMAIN, INSTANCE, plan, str(tmp_path / "sample_1.val"), "crosscheck") == (*val_verdict, mismatch)